@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the Demon Slayer API.
+
+Seeds a database with synthetic catalog data, starts the API and drives it
+with concurrent async clients, then prints throughput and latency
+percentiles per endpoint as JSON.
+
+Two backends are supported:
+  * mongomock - in-memory mongomock-motor; the app runs in-process behind
+                httpx's ASGI transport (no network, one event loop)
+  * mongod    - a real server at MONGO_URL; the app runs under uvicorn in
+                a subprocess and is driven over HTTP
+
+Examples, from the backend directory:
+    python benchmarks/bench_load.py --characters 10000 --duration 20
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=bench \\
+        python benchmarks/bench_load.py --backend mongod --reset \\
+        --characters 1000000 --concurrency 64 --workers 4 --output bench.json
+    OFFLOAD_THRESHOLD=0 python benchmarks/bench_load.py --no-cache \\
+        --endpoints characters_large,character_detail --characters 5000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx  # noqa: E402
+
+RANKS = ["Demon Slayer", "Hashira", "Demon", "Upper Moon", "Lower Moon"]
+STYLES = ["Water Breathing", "Thunder Breathing", "Beast Breathing", "Insect Breathing", "Sun Breathing",
+          "Flame Breathing", "Wind Breathing", "Stone Breathing", "Mist Breathing", "Serpent Breathing"]
+
+# An endpoint picks the path and params of its next request from the run's RNG
+Endpoint = Callable[[random.Random, int], Tuple[str, Optional[dict]]]
+
+ENDPOINTS: Dict[str, Endpoint] = {
+    "characters_page": lambda rnd, n: ("/api/characters", {"limit": 100}),
+    # A large page mixed in with small requests; see OFFLOAD_THRESHOLD
+    "characters_large": lambda rnd, n: ("/api/characters", {"limit": 1000}),
+    "characters_by_rank": lambda rnd, n: ("/api/characters", {"limit": 50, "rank": rnd.choice(RANKS)}),
+    "characters_sparse": lambda rnd, n: ("/api/characters", {"limit": 100, "fields": "name,rank,image"}),
+    "character_detail": lambda rnd, n: (f"/api/characters/{character_id(rnd.randrange(n))}", None),
+    "character_graph": lambda rnd, n: (f"/api/characters/{character_id(rnd.randrange(n))}", {"expand": "techniques"}),
+    "breathing_techniques": lambda rnd, n: ("/api/breathing-techniques", None),
+    "story_arcs": lambda rnd, n: ("/api/story-arcs", None),
+}
+
+
+def character_id(i: int) -> str:
+    return f"bench-{i:07d}"
+
+
+def synthetic_characters(start: int, stop: int) -> List[dict]:
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            "id": character_id(i),
+            "name": f"Bench Character {i}",
+            "description": f"Synthetic character {i} generated for load testing the catalog endpoints.",
+            "breathing": f"{STYLES[i % len(STYLES)]} & {STYLES[(i * 7) % len(STYLES)]}",
+            "rank": RANKS[i % len(RANKS)],
+            "image": f"https://images.example.com/characters/{i}.jpg?w=400&h=600&fit=crop",
+            "abilities": ["Enhanced Senses", f"Technique {i % 13}", f"Form {i % 7}"],
+            "personality": "Determined, loyal, focused",
+            "created_at": base + timedelta(seconds=i),
+            "updated_at": None,
+        }
+        for i in range(start, stop)
+    ]
+
+
+def synthetic_techniques(count: int) -> List[dict]:
+    return [
+        {
+            "id": f"bench-technique-{i}",
+            "name": STYLES[i % len(STYLES)] if i < len(STYLES) else f"Bench Breathing {i}",
+            "description": "Synthetic breathing technique generated for load testing.",
+            "forms": [f"Form {form}" for form in range(1, 8)],
+            "users": [f"Bench Character {user}" for user in range(i, i + 5)],
+            "color": "blue",
+            "element": "💧",
+            "created_at": datetime(2024, 1, 1),
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_arcs(count: int) -> List[dict]:
+    return [
+        {
+            "id": f"bench-arc-{i}",
+            "title": f"Bench Arc {i}",
+            "description": "Synthetic story arc generated for load testing.",
+            "episodes": f"Episodes {i * 3 + 1}-{i * 3 + 3}",
+            "key_events": [f"Event {event}" for event in range(5)],
+            "image": f"https://images.example.com/arcs/{i}.jpg?w=800&h=400&fit=crop",
+            "order": i + 1,
+            "created_at": datetime(2024, 1, 1),
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+async def seed(db, characters: int, techniques: int, arcs: int, batch_size: int = 10000):
+    """Insert synthetic documents in insert_many batches"""
+    from relations import with_relations
+
+    started = time.perf_counter()
+    for start in range(0, characters, batch_size):
+        documents = [with_relations("characters", document)
+                     for document in synthetic_characters(start, min(start + batch_size, characters))]
+        await db.characters.insert_many(documents, ordered=False)
+    if techniques:
+        await db.breathing_techniques.insert_many(synthetic_techniques(techniques), ordered=False)
+    if arcs:
+        await db.story_arcs.insert_many(synthetic_arcs(arcs), ordered=False)
+    return time.perf_counter() - started
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarise(latencies: List[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+
+    def to_ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": to_ms(percentile(latencies, 0.50)),
+            "p95": to_ms(percentile(latencies, 0.95)),
+            "p99": to_ms(percentile(latencies, 0.99)),
+            "max": to_ms(latencies[-1]) if latencies else None,
+        },
+    }
+
+
+async def drive(client: httpx.AsyncClient, endpoints: List[str], characters: int, concurrency: int,
+                duration: float, total_requests: Optional[int], seed_value: int) -> dict:
+    """Run `concurrency` workers against the endpoints until time or requests run out"""
+    latencies: Dict[str, List[float]] = {name: [] for name in endpoints}
+    errors: Dict[str, int] = {name: 0 for name in endpoints}
+    remaining = [total_requests] if total_requests else None
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rnd = random.Random(seed_value + worker_id)
+        while True:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            elif time.perf_counter() >= deadline:
+                return
+            name = rnd.choice(endpoints)
+            path, params = ENDPOINTS[name](rnd, max(characters, 1))
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies[name].append(time.perf_counter() - started)
+            else:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report = {name: summarise(latencies[name], errors[name], elapsed) for name in endpoints}
+    overall = summarise([value for values in latencies.values() for value in values], sum(errors.values()), elapsed)
+    return {"elapsed_seconds": round(elapsed, 3), "overall": overall, "endpoints": report}
+
+
+async def run_mongomock(args) -> dict:
+    from mongomock_motor import AsyncMongoMockClient
+
+    os.environ.setdefault("MONGO_URL", "mongodb://mongomock")
+    os.environ.setdefault("DB_NAME", "bench")
+    import database
+
+    db = database.connect(client_factory=AsyncMongoMockClient)
+    seed_seconds = await seed(db, args.characters, args.techniques, args.arcs)
+
+    import server
+
+    # The lifespan reuses the client created above, then builds indexes
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await warm_up(client, args)
+            results = await drive(client, args.endpoints, args.characters, args.concurrency,
+                                  args.duration, args.requests, args.seed)
+    results["seed_seconds"] = round(seed_seconds, 3)
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API did not become ready in time")
+
+
+async def run_mongod(args) -> dict:
+    import database
+
+    db = database.connect()
+    try:
+        if args.reset:
+            for collection in ("characters", "breathing_techniques", "story_arcs"):
+                await db.drop_collection(collection)
+        seed_seconds = await seed(db, args.characters, args.techniques, args.arcs)
+    finally:
+        database.close()
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+            await wait_until_ready(client)
+            await warm_up(client, args)
+            results = await drive(client, args.endpoints, args.characters, args.concurrency,
+                                  args.duration, args.requests, args.seed)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    results["seed_seconds"] = round(seed_seconds, 3)
+    return results
+
+
+async def warm_up(client: httpx.AsyncClient, args):
+    """Touch every endpoint once so startup costs are not measured"""
+    rnd = random.Random(args.seed)
+    for name in args.endpoints:
+        path, params = ENDPOINTS[name](rnd, max(args.characters, 1))
+        await client.get(path, params=params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("mongomock", "mongod"), default="mongomock")
+    parser.add_argument("--characters", type=int, default=1000, help="synthetic characters to seed (1k-1M)")
+    parser.add_argument("--techniques", type=int, default=10)
+    parser.add_argument("--arcs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client workers")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run when --requests is not set")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead of --duration")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated endpoint names")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (mongod backend)")
+    parser.add_argument("--reset", action="store_true", help="drop the catalog collections before seeding (mongod backend)")
+    parser.add_argument("--no-cache", action="store_true", help="run with CACHE_BACKEND=none")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for request selection")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}; choose from {', '.join(ENDPOINTS)}")
+    if args.no_cache:
+        os.environ["CACHE_BACKEND"] = "none"
+
+    runner = run_mongomock if args.backend == "mongomock" else run_mongod
+    results = asyncio.run(runner(args))
+    report = {
+        "config": {
+            "backend": args.backend,
+            "characters": args.characters,
+            "concurrency": args.concurrency,
+            "workers": args.workers if args.backend == "mongod" else 1,
+            "cache": "none" if args.no_cache else os.environ.get("CACHE_BACKEND", "memory"),
+            "offload_threshold": int(os.environ.get("OFFLOAD_THRESHOLD", "500")),
+        },
+        **results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
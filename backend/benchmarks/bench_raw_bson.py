@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+CPU and allocations of one large list page, starting from the wire.
+
+Every path starts from the BSON bytes of a reply batch and ends with the
+encoded JSON page:
+  * pydantic - decode to dicts, Character(**document), model_dump + orjson
+  * record   - decode to dicts, CharacterRecord.from_document, orjson
+  * raw      - split into RawBSONDocuments (what Motor does with
+               RAW_BSON_READS on), decode the page in one call, orjson
+
+All paths must produce byte-identical bodies.
+
+Run from the backend directory:
+    python benchmarks/bench_raw_bson.py --documents 1000 --iterations 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bson  # noqa: E402
+from bson.codec_options import DEFAULT_CODEC_OPTIONS  # noqa: E402
+from bson.raw_bson import RawBSONDocument  # noqa: E402
+
+from bench_serialization import cpu_per_call, make_documents  # noqa: E402
+
+from models import Character  # noqa: E402
+from raw_bson import decode_rows, encode_raw_page  # noqa: E402
+from read_models import CharacterRecord  # noqa: E402
+from serialization import encode_page  # noqa: E402
+
+RAW_CODEC_OPTIONS = DEFAULT_CODEC_OPTIONS.with_options(document_class=RawBSONDocument)
+NAMES = list(Character.model_fields)
+
+
+def make_batch(count: int) -> bytes:
+    """The documents as the server returns them for the default projection"""
+    return b"".join(
+        bson.encode({name: document[name] for name in NAMES}) for document in make_documents(count)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000, help="documents per page")
+    parser.add_argument("--iterations", type=int, default=200, help="pages to build per path")
+    args = parser.parse_args()
+
+    batch = make_batch(args.documents)
+    paths = {
+        "pydantic": lambda: encode_page([Character(**document) for document in bson.decode_all(batch)]).body,
+        "record": lambda: encode_page([CharacterRecord.from_document(document) for document in bson.decode_all(batch)]).body,
+        "raw": lambda: encode_raw_page(
+            decode_rows(bson.decode_all(batch, RAW_CODEC_OPTIONS), NAMES, DEFAULT_CODEC_OPTIONS)
+        ).body,
+    }
+    bodies = {name: path() for name, path in paths.items()}
+    assert len(set(bodies.values())) == 1, "every path must encode byte-identically"
+
+    results = {"documents": args.documents, "iterations": args.iterations, "paths": {}}
+    for name, path in paths.items():
+        tracemalloc.start()
+        path()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results["paths"][name] = {
+            "cpu_ms_per_page": round(cpu_per_call(path, args.iterations) * 1000, 3),
+            "peak_kib": round(peak / 1024),
+        }
+    cpu = {name: path["cpu_ms_per_page"] for name, path in results["paths"].items()}
+    results["speedup"] = {
+        "raw_vs_pydantic": round(cpu["pydantic"] / cpu["raw"], 1),
+        "raw_vs_record": round(cpu["record"] / cpu["raw"], 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Memory and throughput of the read path: Pydantic models vs read models.
+
+Builds one list of N characters from stored documents and encodes it, with
+  * pydantic - Character(**document), then model_dump() + orjson
+  * record   - CharacterRecord.from_document(document), encoded by orjson
+               directly (see read_models.py)
+
+Reports documents per second for building and for encoding, and the peak
+and retained memory of building the list as measured by tracemalloc. Both
+paths must produce byte-identical JSON.
+
+Run from the backend directory:
+    python benchmarks/bench_read_models.py --documents 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_serialization import make_documents  # noqa: E402
+
+from models import Character  # noqa: E402
+from read_models import CharacterRecord  # noqa: E402
+from serialization import encode_models  # noqa: E402
+
+PATHS = {
+    "pydantic": lambda document: Character(**document),
+    "record": CharacterRecord.from_document,
+}
+
+
+def best_of(fn, repeat: int, *args) -> float:
+    """Fastest wall-clock time of `repeat` runs of fn(*args)"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def memory(build, documents):
+    """Peak and retained bytes of building the list, documents excluded"""
+    gc.collect()
+    tracemalloc.start()
+    rows = [build(document) for document in documents]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100_000, help="documents in the list")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the best is kept")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    bodies = {}
+    results = {"documents": args.documents, "repeat": args.repeat, "paths": {}}
+    for name, build in PATHS.items():
+        rows = [build(document) for document in documents]
+        bodies[name] = encode_models(rows)
+        build_seconds = best_of(lambda: [build(document) for document in documents], args.repeat)
+        encode_seconds = best_of(encode_models, args.repeat, rows)
+        del rows
+        peak, retained = memory(build, documents)
+        results["paths"][name] = {
+            "build_docs_per_second": round(args.documents / build_seconds),
+            "encode_docs_per_second": round(args.documents / encode_seconds),
+            "total_ms": round((build_seconds + encode_seconds) * 1000, 1),
+            "peak_mib": round(peak / 2**20, 1),
+            "retained_bytes_per_doc": round(retained / args.documents),
+        }
+
+    assert bodies["pydantic"] == bodies["record"], "read models must encode byte-identically"
+
+    pydantic, record = results["paths"]["pydantic"], results["paths"]["record"]
+    results["improvement"] = {
+        "throughput": round(pydantic["total_ms"] / record["total_ms"], 1),
+        "memory": round(pydantic["retained_bytes_per_doc"] / record["retained_bytes_per_doc"], 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
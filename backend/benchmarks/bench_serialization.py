@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+CPU cost per list request: FastAPI response_model path vs pre-encoded bodies.
+
+Compares, for one page of N characters:
+  * current  - build Character models, then let FastAPI validate and
+               serialize them through response_model=List[Character]
+  * miss     - build Character models once and encode them with orjson
+               (what a cache miss costs on the fast path)
+  * hit      - return the cached bytes (what every other request costs)
+
+Run from the backend directory:
+    python benchmarks/bench_serialization.py --documents 100 --iterations 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models import Character  # noqa: E402
+from serialization import encode_page, json_response  # noqa: E402
+
+
+def make_documents(count: int) -> List[dict]:
+    return [
+        {
+            "_id": f"{i:024x}",
+            "id": str(i),
+            "name": f"Character {i}",
+            "description": "A demon slayer who trains relentlessly to protect the people they care about. " * 2,
+            "breathing": "Water Breathing & Sun Breathing",
+            "rank": "Demon Slayer",
+            "image": f"https://images.unsplash.com/photo-{1578662996442 + i}-48f60103fc96?w=400&h=600&fit=crop",
+            "abilities": ["Enhanced Smell", "Hard Forehead", "Dance of Fire God"],
+            "personality": "Compassionate, determined, empathetic",
+            "created_at": datetime(2024, 1, 1, 12, 0, 0),
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    """Average CPU seconds per call"""
+    fn()
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100, help="documents per page")
+    parser.add_argument("--iterations", type=int, default=1000, help="requests to simulate per path")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    field = create_response_field(name="Response_get_characters", type_=List[Character])
+    loop = asyncio.new_event_loop()
+
+    def current_path():
+        models = [Character(**document) for document in documents]
+        content = loop.run_until_complete(serialize_response(field=field, response_content=models))
+        return JSONResponse(content).body
+
+    def miss_path():
+        page = encode_page([Character(**document) for document in documents])
+        return json_response(page.body).body
+
+    cached = encode_page([Character(**document) for document in documents])
+
+    def hit_path():
+        return json_response(cached.body).body
+
+    assert json.loads(current_path()) == json.loads(miss_path())
+
+    results = {
+        "documents": args.documents,
+        "iterations": args.iterations,
+        "cpu_ms_per_request": {
+            "current": round(cpu_per_call(current_path, args.iterations) * 1000, 4),
+            "miss": round(cpu_per_call(miss_path, args.iterations) * 1000, 4),
+            "hit": round(cpu_per_call(hit_path, args.iterations) * 1000, 4),
+        },
+    }
+    cpu = results["cpu_ms_per_request"]
+    results["speedup"] = {
+        "miss": round(cpu["current"] / cpu["miss"], 1),
+        "hit": round(cpu["current"] / cpu["hit"], 1),
+    }
+    loop.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
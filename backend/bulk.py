@@ -0,0 +1,149 @@
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+
+import orjson
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+from models import BulkItemResult, BulkResult
+
+# Documents validated and written per insert_many call
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "1000"))
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class BulkPayloadError(ValueError):
+    """Raised when the request body is not a JSON array or NDJSON stream"""
+
+
+def is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_MEDIA_TYPES
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Tuple[Any, str]]:
+    """Yield (item, parse_error) pairs line by line as the body streams in"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> Tuple[Any, str]:
+    try:
+        return orjson.loads(line), ""
+    except orjson.JSONDecodeError as e:
+        return None, f"Invalid JSON: {e}"
+
+
+async def iter_items(request: Request) -> AsyncIterator[Tuple[Any, str]]:
+    """Yield (item, parse_error) pairs from a JSON array or NDJSON body"""
+    if is_ndjson(request):
+        async for pair in _iter_ndjson(request):
+            yield pair
+        return
+
+    try:
+        items = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise BulkPayloadError(f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise BulkPayloadError("Expected a JSON array of items or an NDJSON stream")
+    for item in items:
+        yield item, ""
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'item'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def validate_documents(
+    create_model: Type[BaseModel], model: Type[BaseModel], items: List[Any], ids: List[str],
+) -> List[Tuple[Optional[Dict[str, Any]], str]]:
+    """Validate items into documents with the given ids, as (document, error) pairs.
+
+    Needs nothing but its arguments, so it can run in the offload pool.
+    """
+    validated = []
+    for item, document_id in zip(items, ids):
+        try:
+            document = model(**create_model.model_validate(item).model_dump(), id=document_id).model_dump()
+        except ValidationError as e:
+            validated.append((None, validation_message(e)))
+            continue
+        validated.append((document, ""))
+    return validated
+
+
+async def _write_chunk(collection, chunk: List[Tuple[int, Dict[str, Any]]], results: BulkResult):
+    """insert_many one validated chunk and record the outcome per item"""
+    failed: Dict[int, str] = {}
+    try:
+        # ordered=False lets the server keep going past individual failures
+        await collection.insert_many([document for _, document in chunk], ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            failed[write_error["index"]] = write_error.get("errmsg", "Write failed")
+
+    for position, (index, document) in enumerate(chunk):
+        if position in failed:
+            results.failed += 1
+            results.results.append(BulkItemResult(index=index, status="error", error=failed[position]))
+        else:
+            results.inserted += 1
+            results.results.append(BulkItemResult(index=index, status="created", id=document["id"]))
+
+
+async def bulk_insert(
+    collection,
+    create_model: Type[BaseModel],
+    model: Type[BaseModel],
+    items: AsyncIterator[Tuple[Any, str]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    results: Optional[BulkResult] = None,
+) -> BulkResult:
+    """Validate and insert items in chunks, reporting success or failure per item.
+
+    `prepare` is applied to each validated document before it is written.
+    Outcomes are recorded in `results` as chunks are written, so a caller
+    passing it in still knows what was created if a later chunk fails.
+    """
+    results = results if results is not None else BulkResult()
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    index = 0
+
+    async for item, parse_error in items:
+        if parse_error:
+            results.failed += 1
+            results.results.append(BulkItemResult(index=index, status="error", error=parse_error))
+        else:
+            try:
+                document = model(**create_model.model_validate(item).model_dump()).model_dump()
+                if prepare:
+                    document = prepare(document)
+                chunk.append((index, document))
+            except ValidationError as e:
+                results.failed += 1
+                results.results.append(BulkItemResult(index=index, status="error", error=validation_message(e)))
+        index += 1
+
+        if len(chunk) >= chunk_size:
+            await _write_chunk(collection, chunk, results)
+            chunk = []
+
+    if chunk:
+        await _write_chunk(collection, chunk, results)
+
+    results.results.sort(key=lambda result: result.index)
+    return results
@@ -0,0 +1,235 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+# Cache namespaces match the Mongo collection names they front, plus
+# "relations" for joined character/technique views
+NAMESPACES = ("characters", "breathing_techniques", "story_arcs", "relations")
+
+# Namespaces built from several collections, dropped when any of them changes
+DEPENDENT_NAMESPACES = {
+    "characters": ("relations",),
+    "breathing_techniques": ("relations",),
+}
+
+_MISSING = object()
+
+
+class CacheStats:
+    """Hit/miss counters for one namespace"""
+
+    __slots__ = ("hits", "misses", "evictions", "expirations", "invalidations")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class Cache(ABC):
+    """Interface every cache backend implements"""
+
+    @abstractmethod
+    def get(self, namespace: str, key: Hashable) -> Any:
+        """The cached value, or _MISSING"""
+
+    @abstractmethod
+    def set(self, namespace: str, key: Hashable, value: Any):
+        """Store a value under a namespace"""
+
+    @abstractmethod
+    def invalidate(self, namespace: str):
+        """Drop every entry in a namespace"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Backend name and per-namespace counters"""
+
+    def invalidate_collection(self, collection: str):
+        """Drop everything derived from a collection after it was written"""
+        self.invalidate(collection)
+        for namespace in DEPENDENT_NAMESPACES.get(collection, ()):
+            self.invalidate(namespace)
+
+    async def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Read-through lookup: return the cached value or load and store it.
+
+        A loader returning None (nothing found) is not stored, so lookups
+        of ids that do not exist cannot push real entries out.
+        """
+        value = self.get(namespace, key)
+        if value is not _MISSING:
+            return value
+        value = await loader()
+        if value is not None:
+            self.set(namespace, key, value)
+        return value
+
+
+class NullCache(Cache):
+    """Backend that never stores anything; every lookup goes to the loader"""
+
+    def __init__(self):
+        self._stats: Dict[str, CacheStats] = {}
+
+    def get(self, namespace, key):
+        self._stats.setdefault(namespace, CacheStats()).misses += 1
+        return _MISSING
+
+    def set(self, namespace, key, value):
+        pass
+
+    def invalidate(self, namespace):
+        self._stats.setdefault(namespace, CacheStats()).invalidations += 1
+
+    def stats(self):
+        return {"backend": "none", "namespaces": {ns: s.as_dict() for ns, s in self._stats.items()}}
+
+
+class MemoryCache(Cache):
+    """Bounded in-process LRU cache with per-namespace TTLs.
+
+    Concurrent misses for the same key share one loader call, so a cold or
+    freshly invalidated entry costs a single database query however many
+    requests arrive for it at once.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300.0, ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._keys: Dict[str, Set[Tuple[str, Hashable]]] = {}
+        self._stats: Dict[str, CacheStats] = {}
+        self._loading: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        # Bumped on invalidation so loads started before a write are not stored
+        self._generations: Dict[str, int] = {}
+
+    def _stat(self, namespace: str) -> CacheStats:
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = CacheStats()
+        return stats
+
+    def _discard(self, entry_key):
+        self._entries.pop(entry_key, None)
+        keys = self._keys.get(entry_key[0])
+        if keys is not None:
+            keys.discard(entry_key)
+
+    def get(self, namespace, key):
+        entry_key = (namespace, key)
+        entry = self._entries.get(entry_key)
+        stats = self._stat(namespace)
+        if entry is None:
+            stats.misses += 1
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(entry_key)
+            stats.expirations += 1
+            stats.misses += 1
+            return _MISSING
+        self._entries.move_to_end(entry_key)
+        stats.hits += 1
+        return value
+
+    def set(self, namespace, key, value):
+        ttl = self.ttls.get(namespace, self.default_ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        entry_key = (namespace, key)
+        self._entries[entry_key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(entry_key)
+        self._keys.setdefault(namespace, set()).add(entry_key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self._stat(oldest[0]).evictions += 1
+
+    def invalidate(self, namespace):
+        for entry_key in self._keys.pop(namespace, set()):
+            self._entries.pop(entry_key, None)
+        # Requests arriving after the write must not join a load that
+        # started before it
+        for entry_key in [entry_key for entry_key in self._loading if entry_key[0] == namespace]:
+            del self._loading[entry_key]
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._stat(namespace).invalidations += 1
+
+    async def get_or_load(self, namespace, key, loader):
+        value = self.get(namespace, key)
+        if value is not _MISSING:
+            return value
+
+        # The load runs in its own task so a client disconnecting does not
+        # cancel it for every other request waiting on the same key.
+        entry_key = (namespace, key)
+        task = self._loading.get(entry_key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(namespace, key, loader))
+            self._loading[entry_key] = task
+            task.add_done_callback(lambda done: self._load_finished(entry_key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, namespace, key, loader):
+        generation = self._generations.get(namespace, 0)
+        value = await loader()
+        if value is not None and self._generations.get(namespace, 0) == generation:
+            self.set(namespace, key, value)
+        return value
+
+    def _load_finished(self, entry_key, task: asyncio.Future):
+        if self._loading.get(entry_key) is task:
+            del self._loading[entry_key]
+        if not task.cancelled():
+            # Mark failures as retrieved even when every waiter went away
+            task.exception()
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "namespaces": {ns: s.as_dict() for ns, s in self._stats.items()},
+        }
+
+
+def build_cache() -> Cache:
+    """Create the cache backend configured through the environment"""
+    backend = os.environ.get("CACHE_BACKEND", "memory").lower()
+    if backend == "none":
+        return NullCache()
+    if backend != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+    default_ttl = float(os.environ.get("CACHE_TTL_SECONDS", "300"))
+    ttls = {
+        namespace: float(os.environ[f"CACHE_TTL_{namespace.upper()}"])
+        for namespace in NAMESPACES
+        if f"CACHE_TTL_{namespace.upper()}" in os.environ
+    }
+    return MemoryCache(
+        max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "1024")),
+        default_ttl=default_ttl,
+        ttls=ttls,
+    )
+
+
+catalog_cache = build_cache()
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Sequence
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from cache import Cache, catalog_cache
+from database import get_collection, CHARACTERS, BREATHING_TECHNIQUES, STORY_ARCS
+from events import REFRESH, broadcaster
+from seed import META_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Every worker keeps its own catalog cache. CacheSync listens for writes made
+# by any worker (or anything else) and drops the affected entries:
+#
+#   changestream - a MongoDB change stream on the catalog collections;
+#                  needs a replica set or sharded cluster
+#   poll         - reads per-collection version counters that notify_write()
+#                  bumps in the meta collection; only sees writes made
+#                  through the API
+#   auto         - change streams, falling back to polling when the server
+#                  cannot open one
+#   off          - local invalidation only
+CACHE_SYNC_MODE = os.environ.get("CACHE_SYNC", "auto").lower()
+POLL_INTERVAL_SECONDS = float(os.environ.get("CACHE_SYNC_POLL_SECONDS", "1"))
+MIN_RETRY_SECONDS = 1.0
+MAX_RETRY_SECONDS = 30.0
+
+WATCHED_COLLECTIONS = (CHARACTERS, BREATHING_TECHNIQUES, STORY_ARCS)
+
+VERSION_PREFIX = "version:"
+
+# Server error raised when a resume token is older than the oplog window
+CHANGE_STREAM_HISTORY_LOST = 286
+# Server errors meaning this deployment can never open a change stream
+CHANGE_STREAM_UNSUPPORTED = (
+    40573,  # $changeStream is only supported on replica sets
+    40324,  # Unrecognized pipeline stage name: '$changeStream' (before 3.6)
+)
+
+# Writes touching more documents than this are announced as one refresh
+MAX_EVENT_IDS = int(os.environ.get("SSE_MAX_EVENT_IDS", "100"))
+
+
+class ChangeStreamUnavailable(Exception):
+    """Raised when the server cannot open a change stream at all"""
+
+
+def _unsupported(error: Exception) -> bool:
+    if isinstance(error, OperationFailure):
+        return error.code in CHANGE_STREAM_UNSUPPORTED
+    # Anything but a driver error means the client has no working watch()
+    return not isinstance(error, PyMongoError)
+
+
+async def notify_write(
+    collection: str, ids: Optional[Sequence[str]] = None, event_type: str = "insert", cache: Cache = catalog_cache,
+):
+    """Record a write so this and every other worker drop cached reads.
+
+    The local cache is invalidated immediately so the writer reads its own
+    write; the version bump is what polling workers pick up. `ids` are the
+    documents written, announced to event stream subscribers as `event_type`
+    unless a change stream is already doing that; None means "reload the
+    collection".
+    """
+    cache.invalidate_collection(collection)
+    if cache_sync.active_mode != "changestream":
+        if ids is None or len(ids) > MAX_EVENT_IDS:
+            broadcaster.publish({"type": REFRESH, "collection": collection})
+        else:
+            for document_id in ids:
+                broadcaster.publish({"type": event_type, "collection": collection, "id": document_id})
+    try:
+        counter = await get_collection(META_COLLECTION).find_one_and_update(
+            {"_id": VERSION_PREFIX + collection}, {"$inc": {"version": 1}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        cache_sync.acknowledge(collection, counter["version"])
+    except PyMongoError as e:
+        logger.warning(f"Could not bump the {collection} version counter: {e}")
+
+
+class CacheSync:
+    """Background task keeping the local cache in step with database writes"""
+
+    def __init__(
+        self,
+        cache: Cache = catalog_cache,
+        collections: Sequence[str] = WATCHED_COLLECTIONS,
+        mode: str = CACHE_SYNC_MODE,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+    ):
+        if mode not in ("auto", "changestream", "poll", "off"):
+            raise ValueError(f"Unknown CACHE_SYNC mode: {mode}")
+        self.cache = cache
+        self.collections = tuple(collections)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        # Changes observed per collection since this worker started
+        self.versions: Dict[str, int] = {collection: 0 for collection in self.collections}
+        self.active_mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        # Version counters last seen by the poller
+        self._seen: Optional[Dict[str, int]] = None
+
+    def start(self, db):
+        if self.mode != "off" and self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.active_mode = None
+        self._seen = None
+
+    def status(self) -> Dict:
+        return {"mode": self.mode, "active": self.active_mode, "versions": dict(self.versions)}
+
+    def acknowledge(self, collection: str, version: int):
+        """Note a counter bump made by this worker so the poller skips it"""
+        key = VERSION_PREFIX + collection
+        if self._seen is not None and self._seen.get(key, 0) == version - 1:
+            self._seen[key] = version
+
+    def _changed(self, collection: str, event: Optional[Dict] = None):
+        if collection in self.versions:
+            self.versions[collection] += 1
+            self.cache.invalidate_collection(collection)
+            broadcaster.publish(event or {"type": REFRESH, "collection": collection})
+
+    def _changed_all(self):
+        for collection in self.collections:
+            self._changed(collection)
+
+    async def _run(self, db):
+        if self.mode in ("auto", "changestream"):
+            try:
+                await self._watch(db)
+                return
+            except ChangeStreamUnavailable as e:
+                if self.mode == "changestream":
+                    logger.error(f"Change streams unavailable, cache sync disabled: {e}")
+                    return
+                logger.info(f"Change streams unavailable, polling version counters instead: {e}")
+        await self._poll(db)
+
+    async def _watch(self, db):
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(self.collections)}}},
+            # Only the API id is needed; _id carries the resume token
+            {"$project": {"operationType": 1, "ns": 1, "fullDocument.id": 1}},
+        ]
+        resume_token = None
+        retry = MIN_RETRY_SECONDS
+        while True:
+            try:
+                async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                    self.active_mode = "changestream"
+                    retry = MIN_RETRY_SECONDS
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        if change["operationType"] == "invalidate":
+                            break
+                        collection = change["ns"]["coll"]
+                        self._changed(collection, {
+                            "type": change["operationType"],
+                            "collection": collection,
+                            "id": (change.get("fullDocument") or {}).get("id"),
+                        })
+                # Dropped or renamed collections end the stream; start afresh
+                resume_token = None
+                self._changed_all()
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Network errors and a server still starting up are retried
+                # like any interruption, rather than giving up on change
+                # streams for the life of the worker
+                if _unsupported(e):
+                    raise ChangeStreamUnavailable(str(e) or type(e).__name__)
+                if isinstance(e, OperationFailure) and e.code == CHANGE_STREAM_HISTORY_LOST:
+                    resume_token = None
+                logger.warning(f"Change stream interrupted, retrying in {retry:.0f}s: {e}")
+            # Writes may have been missed while the stream was down
+            self._changed_all()
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, MAX_RETRY_SECONDS)
+
+    async def _poll(self, db):
+        self.active_mode = "poll"
+        ids = [VERSION_PREFIX + collection for collection in self.collections]
+        while True:
+            try:
+                documents = await db[META_COLLECTION].find({"_id": {"$in": ids}}).to_list(len(ids))
+                current = {document["_id"]: document.get("version", 0) for document in documents}
+                if self._seen is not None:
+                    for collection in self.collections:
+                        key = VERSION_PREFIX + collection
+                        if current.get(key, 0) != self._seen.get(key, 0):
+                            self._changed(collection)
+                self._seen = current
+            except PyMongoError as e:
+                logger.warning(f"Could not poll cache version counters: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+cache_sync = CacheSync()
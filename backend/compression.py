@@ -0,0 +1,209 @@
+import gzip
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    # Optional: br is only offered when the brotli package is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the framing overhead and
+# CPU cost are not worth it for a handful of bytes
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Server preference when the client accepts several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+# Event streams are sent uncompressed so proxies never hold events back
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+VARY_HEADER = "Accept-Encoding"
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the content coding to use for an Accept-Encoding header, if any"""
+    if not accept_encoding:
+        return None
+    weights = _accepted(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) and media_type not in UNCOMPRESSED_TYPES
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def coding_etag(etag: str, encoding: str) -> str:
+    """Strong ETag for the copy of a representation compressed with encoding.
+
+    Compressed bytes differ from the identity body, so each coding gets its
+    own tag: "<hash>" becomes "<hash>-br". entity_etag() maps it back.
+    """
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def entity_etag(etag: str) -> str:
+    """The identity ETag for a tag coding_etag() minted, or etag unchanged"""
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+class _StreamCompressor:
+    """Incremental compressor flushing after every chunk so streams stay live"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._flush = self._compressor.flush
+            self._process = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            # wbits=31 selects the gzip container
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._process = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._process(data) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return [*headers, (b"vary", VARY_HEADER.encode())]
+    if VARY_HEADER.lower().encode() in vary.lower():
+        return headers
+    return [(k, v + b", " + VARY_HEADER.encode() if k.lower() == b"vary" else v) for k, v in headers]
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses the routes did not compress.
+
+    Pre-encoded catalog responses arrive already compressed from the cache
+    and are passed through untouched, as is anything below the size
+    threshold or with a non-text media type. Single-message bodies are
+    compressed in one go; streamed bodies (NDJSON exports) are compressed
+    chunk by chunk.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = negotiate(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = _header(headers, b"content-type")
+                if (
+                    _header(headers, b"content-encoding") is not None
+                    or content_type is None
+                    or not is_compressible(content_type.decode("latin-1"))
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Wait for the first body chunk to choose how to send it
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = start.get("headers", [])
+                if not more_body and len(body) < self.min_size:
+                    passthrough = True
+                    await send({**start, "headers": _add_vary(headers)})
+                    await send(message)
+                    return
+                headers = [(k, v) for k, v in _add_vary(headers) if k.lower() not in (b"content-length", b"etag")]
+                etag = _header(start.get("headers", []), b"etag")
+                if etag is not None:
+                    headers.append((b"etag", coding_etag(etag.decode("latin-1"), encoding).encode()))
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    start = None
+                    return
+                await send({**start, "headers": headers})
+                start = None
+                compressor = _StreamCompressor(encoding)
+
+            data = compressor.chunk(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from compression import COMPRESSION_MIN_SIZE, VARY_HEADER, coding_etag, compress, entity_etag, negotiate
+from serialization import EncodedBody, json_response
+
+# Clients may keep a copy but must revalidate it before every reuse
+CACHE_CONTROL = "no-cache"
+
+
+def http_date(value: datetime) -> str:
+    """Format a (naive UTC) datetime as an HTTP-date"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/"x" matches "x". Tags minted
+    # for compressed copies stand for the same entity as the identity tag.
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(entity_etag(tag.removeprefix("W/")) == etag for tag in candidates)
+
+
+def _etag_matches_strongly(header: str, etag: str) -> bool:
+    # If-Match uses the strong comparison: a weak tag never matches, but a
+    # compressed copy's "<hash>-br" names the same entity as "<hash>"
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(
+        not tag.startswith("W/") and entity_etag(tag) == etag for tag in candidates
+    )
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(request: Request, encoded: EncodedBody) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against an encoded body"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored whenever If-None-Match is present
+        return _etag_matches(if_none_match, encoded.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and encoded.last_modified:
+        return _not_modified_since(if_modified_since, encoded.last_modified)
+    return False
+
+
+def precondition_failed(request: Request, current: Optional[EncodedBody]) -> bool:
+    """Evaluate If-Match / If-None-Match for a write against the current representation"""
+    if_match = request.headers.get("if-match")
+    if if_match is not None:
+        return current is None or not _etag_matches_strongly(if_match, current.etag)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return current is not None and _etag_matches(if_none_match, current.etag)
+    return False
+
+
+def validator_headers(encoded: EncodedBody, encoding: Optional[str] = None) -> Dict[str, str]:
+    """ETag, Last-Modified and Cache-Control headers for an encoded body"""
+    etag = coding_etag(encoded.etag, encoding) if encoding else encoded.etag
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY_HEADER}
+    if encoded.last_modified:
+        headers["Last-Modified"] = http_date(encoded.last_modified)
+    return headers
+
+
+def compressed_body(encoded: EncodedBody, encoding: str) -> bytes:
+    """Compress an encoded body once per content coding and keep the result"""
+    body = encoded.compressed.get(encoding)
+    if body is None:
+        body = encoded.compressed[encoding] = compress(encoded.body, encoding)
+    return body
+
+
+def conditional_response(request: Request, encoded: EncodedBody, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve an encoded body, or an empty 304 when the client copy is current.
+
+    The body is compressed when the client accepts it and it is large enough.
+    """
+    encoding = None
+    if len(encoded.body) >= COMPRESSION_MIN_SIZE:
+        encoding = negotiate(request.headers.get("accept-encoding"))
+    all_headers = validator_headers(encoded, encoding)
+    if headers:
+        all_headers.update(headers)
+    if is_not_modified(request, encoded):
+        return Response(status_code=304, headers=all_headers)
+    if encoding:
+        all_headers["Content-Encoding"] = encoding
+        return json_response(compressed_body(encoded, encoding), all_headers)
+    return json_response(encoded.body, all_headers)
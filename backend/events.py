@@ -0,0 +1,162 @@
+import asyncio
+import os
+import secrets
+import weakref
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+import orjson
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+# Events buffered per subscriber before it is considered too slow
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", "256"))
+MAX_SUBSCRIBERS = int(os.environ.get("SSE_MAX_SUBSCRIBERS", "10000"))
+# Recent events kept for clients reconnecting with Last-Event-ID
+REPLAY_SIZE = int(os.environ.get("SSE_REPLAY_SIZE", "1024"))
+
+# Tells a client it may have missed events and should reload everything
+REFRESH = "refresh"
+
+KEEP_ALIVE = b": keep-alive\n\n"
+# Queued to a stream to end it
+_CLOSE = None
+
+
+class TooManySubscribers(Exception):
+    """Raised when a worker already holds MAX_SUBSCRIBERS streams"""
+
+
+class BroadcasterClosed(Exception):
+    """Raised when a stream is requested while the worker shuts down"""
+
+
+def format_event(event_id: str, event: Dict[str, Any]) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event["type"].encode(), orjson.dumps(event))
+
+
+class Broadcaster:
+    """Fans catalog change events out to every open SSE stream.
+
+    publish() formats an event once and drops it into each subscriber's
+    bounded queue without awaiting, so a thousand idle streams cost a
+    thousand queue appends per event and no extra tasks. A subscriber whose
+    queue fills up loses its backlog and is sent a single refresh event.
+    One shared task sends keep-alives, so idle streams hold no timers.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE, replay_size: int = REPLAY_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._recent: Deque[Tuple[int, bytes]] = deque(maxlen=replay_size)
+        # Event ids are "<epoch>-<n>". The counter is per process, so an id
+        # from another worker or an earlier run says nothing about what a
+        # client missed here.
+        self.epoch = secrets.token_hex(4)
+        self._last_id = 0
+        self._heartbeats: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _event_id(self, n: int) -> str:
+        return f"{self.epoch}-{n}"
+
+    def publish(self, event: Dict[str, Any]):
+        self._last_id += 1
+        message = format_event(self._event_id(self._last_id), event)
+        self._recent.append((self._last_id, message))
+        for queue in self._subscribers:
+            self._offer(queue, message)
+
+    def _offer(self, queue: asyncio.Queue, message: bytes):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(format_event(self._event_id(self._last_id), {"type": REFRESH}))
+
+    def _replay(self, last_event_id: Optional[str]):
+        """Messages published after last_event_id, or a refresh if they are gone"""
+        if not last_event_id:
+            return []
+        refresh = [format_event(self._event_id(self._last_id), {"type": REFRESH})]
+        epoch, _, counter = last_event_id.partition("-")
+        try:
+            after = int(counter)
+        except ValueError:
+            return refresh
+        # Ids from another process, or ahead of this one, cannot be replayed
+        if epoch != self.epoch or after > self._last_id:
+            return refresh
+        if after == self._last_id:
+            return []
+        if not self._recent or self._recent[0][0] > after + 1:
+            return refresh
+        return [message for event_id, message in self._recent if event_id > after]
+
+    def start(self, heartbeat: float = HEARTBEAT_SECONDS):
+        if self._heartbeats is None:
+            self._closed = False
+            self._heartbeats = asyncio.create_task(self._send_heartbeats(heartbeat))
+
+    def close(self):
+        """End every open stream and refuse new ones until the next start()"""
+        self._closed = True
+        subscribers, self._subscribers = self._subscribers, set()
+        for queue in subscribers:
+            if queue.full():
+                while not queue.empty():
+                    queue.get_nowait()
+            queue.put_nowait(_CLOSE)
+
+    async def stop(self):
+        self.close()
+        if self._heartbeats is not None:
+            self._heartbeats.cancel()
+            try:
+                await self._heartbeats
+            except asyncio.CancelledError:
+                pass
+            self._heartbeats = None
+
+    async def _send_heartbeats(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            for queue in self._subscribers:
+                # Streams with messages pending are not idle
+                if queue.empty():
+                    queue.put_nowait(KEEP_ALIVE)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE body for one client; unsubscribes when the client goes away"""
+        if self._closed:
+            raise BroadcasterClosed("The server is shutting down")
+        if len(self._subscribers) >= MAX_SUBSCRIBERS:
+            raise TooManySubscribers(f"Event stream limit of {MAX_SUBSCRIBERS} reached")
+        # Registered straight away so concurrent connections count against
+        # the limit before their streams start
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        for message in self._replay(last_event_id):
+            self._offer(queue, message)
+        self._subscribers.add(queue)
+        stream = self._drain(queue)
+        # A stream that is never iterated never reaches its finally block
+        weakref.finalize(stream, self._subscribers.discard, queue)
+        return stream
+
+    async def _drain(self, queue: asyncio.Queue) -> AsyncIterator[bytes]:
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield b"retry: 3000\n\n"
+            while True:
+                message = await queue.get()
+                if message is _CLOSE:
+                    return
+                yield message
+        finally:
+            self._subscribers.discard(queue)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,47 @@
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import orjson
+
+from pagination import SortSpec
+
+# Documents pulled from the cursor and written per chunk
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+logger = logging.getLogger(__name__)
+
+
+def encode_ndjson(documents: List[Dict[str, Any]], names: Optional[Sequence[str]] = None) -> bytes:
+    """Documents as NDJSON lines, keeping only `names` when given; runs inline or in the pool"""
+    if names is not None:
+        documents = [{name: document[name] for name in names if name in document} for document in documents]
+    return b"".join(orjson.dumps(document) + b"\n" for document in documents)
+
+
+async def iter_ndjson(
+    collection,
+    projection: Dict[str, int],
+    sort: SortSpec,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """Stream a whole collection as NDJSON, one chunk per cursor batch.
+
+    Only one batch is held in memory at a time, and the first chunk is sent
+    as soon as the first batch arrives rather than after the whole query.
+    """
+    cursor = collection.find({}, projection).sort(list(sort)).batch_size(batch_size)
+    try:
+        while True:
+            documents = await cursor.to_list(batch_size)
+            if not documents:
+                break
+            yield encode_ndjson(documents)
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated stream
+        logger.error(f"Export of {collection.name} failed mid-stream: {e}")
+        raise
+    finally:
+        await cursor.close()
@@ -0,0 +1,78 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from pagination import SortSpec
+
+# Fields each list endpoint may be sorted by. Every one is backed by a
+# compound (field, id) index in indexes.py so sorted pages are index scans.
+SORT_FIELDS: Dict[str, Sequence[str]] = {
+    "characters": ("id", "name", "rank", "breathing"),
+    "breathing_techniques": ("id", "name", "element"),
+    "story_arcs": ("id", "order", "title"),
+}
+
+
+# Most ids accepted by one ?ids= batch lookup
+MAX_BATCH_IDS = int(os.environ.get("MAX_BATCH_IDS", "100"))
+
+
+class InvalidQuery(ValueError):
+    """Raised for unknown sort fields or malformed filter parameters"""
+
+
+def parse_sort(collection: str, sort: Optional[str], default: SortSpec) -> SortSpec:
+    """Parse sort=-rank,name into a sort spec ending in the unique id key"""
+    if not sort:
+        return default
+    allowed = SORT_FIELDS[collection]
+    spec = []
+    for term in (term.strip() for term in sort.split(",")):
+        if not term:
+            continue
+        direction = -1 if term.startswith("-") else 1
+        field = term.lstrip("+-")
+        if field not in allowed:
+            raise InvalidQuery(f"Cannot sort by {field!r}; allowed: {', '.join(allowed)}")
+        if any(existing == field for existing, _ in spec):
+            raise InvalidQuery(f"Duplicate sort field {field!r}")
+        spec.append((field, direction))
+    if not spec:
+        return default
+    # id breaks ties so every row keeps a stable keyset position. It follows
+    # the direction of the last key, so -name walks the (name, id) index
+    # backwards instead of needing an in-memory sort
+    if all(field != "id" for field, _ in spec):
+        spec.append(("id", spec[-1][1]))
+    return tuple(spec)
+
+
+def build_query(q: Optional[str] = None, **filters: Any) -> Dict[str, Any]:
+    """Combine equality/range filters and full-text search into a Mongo query.
+
+    Filters whose value is None are left out. A dict value is used as an
+    operator expression, so order={"$gte": 3} becomes a range filter.
+    """
+    query: Dict[str, Any] = {}
+    for field, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            value = {op: bound for op, bound in value.items() if bound is not None}
+            if not value:
+                continue
+        query[field] = value
+    if q:
+        query["$text"] = {"$search": q}
+    return query
+
+
+def parse_ids(ids: str) -> List[str]:
+    """Parse ids=1,2,3 into distinct ids, keeping the order they were asked for"""
+    parsed = list(dict.fromkeys(part.strip() for part in ids.split(",") if part.strip()))
+    if not parsed:
+        raise InvalidQuery("ids must list at least one id")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise InvalidQuery(f"At most {MAX_BATCH_IDS} ids may be requested at once")
+    if any(not character.isprintable() for id_ in parsed for character in id_):
+        raise InvalidQuery("ids must not contain control characters")
+    return parsed
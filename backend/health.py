@@ -0,0 +1,45 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+# Readiness reuses one ping result for this long, so probes from every
+# orchestrator and load balancer add at most one round trip per interval
+PING_TTL_SECONDS = float(os.environ.get("HEALTH_PING_TTL_SECONDS", "2"))
+PING_TIMEOUT_SECONDS = float(os.environ.get("HEALTH_PING_TIMEOUT_SECONDS", "1"))
+
+
+class PingCheck:
+    """Cached result of a MongoDB `ping`, refreshed at most once per TTL"""
+
+    def __init__(self, ttl: float = PING_TTL_SECONDS, timeout: float = PING_TIMEOUT_SECONDS):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def check(self, db) -> Dict[str, Any]:
+        if not self._fresh():
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                # Probes that queued behind a ping reuse its result
+                if not self._fresh():
+                    self._result = await self._ping(db)
+                    self._checked_at = time.monotonic()
+        return {**self._result, "age_seconds": round(time.monotonic() - self._checked_at, 3)}
+
+    async def _ping(self, db) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), self.timeout)
+        except Exception as e:
+            return {"ok": False, "error": str(e) or type(e).__name__}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+ping_check = PingCheck()
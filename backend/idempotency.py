@@ -0,0 +1,101 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, Request, Response
+from pymongo.errors import DuplicateKeyError
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Stored responses expire through a TTL index on created_at (see indexes.py)
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# A key still pending after this long belongs to a request that died, and
+# the next retry may take it over
+PENDING_TIMEOUT_SECONDS = int(os.environ.get("IDEMPOTENCY_PENDING_SECONDS", "30"))
+MAX_KEY_LENGTH = 255
+
+PENDING = "pending"
+DONE = "done"
+
+
+def request_fingerprint(request: Request, body: bytes) -> str:
+    """Hash of what the client asked for, to catch a key reused for another request"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{request.method} {request.url.path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _replay(record) -> Response:
+    response = record["response"]
+    return Response(
+        content=response["body"],
+        status_code=response["status_code"],
+        media_type=response["media_type"],
+        headers={**response.get("headers", {}), REPLAYED_HEADER: "true"},
+    )
+
+
+async def _claim(collection, key: str, fingerprint: str):
+    """Insert the key as pending; return the existing record if someone got there first"""
+    now = datetime.utcnow()
+    try:
+        await collection.insert_one({"_id": key, "fingerprint": fingerprint, "status": PENDING, "created_at": now})
+        return None
+    except DuplicateKeyError:
+        pass
+    # Take over a pending key whose request never finished
+    stale = now - timedelta(seconds=PENDING_TIMEOUT_SECONDS)
+    taken = await collection.update_one(
+        {"_id": key, "fingerprint": fingerprint, "status": PENDING, "created_at": {"$lt": stale}},
+        {"$set": {"created_at": now}},
+    )
+    if taken.modified_count:
+        return None
+    return await collection.find_one({"_id": key}) or {"fingerprint": fingerprint, "status": PENDING}
+
+
+async def idempotent(request: Request, collection, handler: Callable[[], Awaitable[Response]]) -> Response:
+    """Run a write at most once per Idempotency-Key.
+
+    The first request with a key runs the handler and stores its response;
+    retries with the same key and body get that response back. A retry that
+    arrives while the first attempt is still running gets 409, and reusing a
+    key for a different request gets 422. If the handler fails, the key is
+    released so the client can try again.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return await handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+    fingerprint = request_fingerprint(request, await request.body())
+    # Keys are scoped to the route so one key cannot replay another endpoint
+    record_id = f"{request.method} {request.url.path} {key}"
+    existing = await _claim(collection, record_id, fingerprint)
+    if existing is not None:
+        if existing["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+        if existing["status"] == DONE:
+            return _replay(existing)
+        raise HTTPException(status_code=409, detail="A request with this idempotency key is still in progress",
+                            headers={"Retry-After": "1"})
+
+    try:
+        response = await handler()
+    except BaseException:
+        await collection.delete_one({"_id": record_id, "status": PENDING})
+        raise
+
+    stored = {
+        "status_code": response.status_code,
+        "body": bytes(response.body),
+        "media_type": response.media_type,
+        "headers": {name: value for name, value in response.headers.items() if name.lower() in ("etag", "location")},
+    }
+    await collection.update_one({"_id": record_id}, {"$set": {"status": DONE, "response": stored}})
+    return response
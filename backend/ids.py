@@ -0,0 +1,38 @@
+import os
+import secrets
+import time
+import uuid
+
+from bson import ObjectId
+
+# How server-assigned document ids are minted:
+#   uuid4    - 36-character random UUID strings (the original format)
+#   objectid - 24-character hex ObjectIds
+#   ulid     - 26-character Crockford base32 ULIDs
+# ObjectIds and ULIDs start with a timestamp, so new ids sort after old ones
+# and inserts append to the right edge of the id index instead of landing on
+# random pages. Existing ids are never rewritten; strategies can be mixed.
+ID_STRATEGY = os.environ.get("ID_STRATEGY", "uuid4").lower()
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def ulid() -> str:
+    """48-bit millisecond timestamp followed by 80 random bits"""
+    value = (int(time.time() * 1000) << 80) | secrets.randbits(80)
+    return "".join(_CROCKFORD[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+_GENERATORS = {
+    "uuid4": lambda: str(uuid.uuid4()),
+    "objectid": lambda: str(ObjectId()),
+    "ulid": ulid,
+}
+
+if ID_STRATEGY not in _GENERATORS:
+    raise ValueError(f"Unknown ID_STRATEGY: {ID_STRATEGY}")
+
+
+def new_id() -> str:
+    """A new document id in the configured format"""
+    return _GENERATORS[ID_STRATEGY]()
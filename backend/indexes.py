@@ -0,0 +1,188 @@
+"""Declarative MongoDB index registry.
+
+Every index the API relies on is declared in INDEXES below. At startup
+ensure_indexes() compares the registry with what exists on the server,
+creates anything missing and reports drift. Run this module directly to
+check a database without touching the app:
+
+    python indexes.py --dry-run
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+from pymongo import ASCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+from idempotency import IDEMPOTENCY_COLLECTION, IDEMPOTENCY_TTL_SECONDS
+from jobs import JOB_EXPORTS_COLLECTION, JOB_TTL_SECONDS, JOBS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """A single declared index"""
+    name: str
+    keys: Sequence[Tuple[str, Any]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "characters": [
+        IndexSpec("id_unique", [("id", ASCENDING)], {"unique": True}),
+        # (field, id) compounds serve both the equality filter and the
+        # id-ordered keyset seek, and sort=field pages
+        IndexSpec("rank_id", [("rank", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("breathing_id", [("breathing", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("name_id", [("name", ASCENDING), ("id", ASCENDING)]),
+        # Technique -> characters join on the precomputed style names, read
+        # in id order
+        IndexSpec("breathing_styles_id", [("breathing_styles", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("search", [("name", TEXT), ("description", TEXT)]),
+    ],
+    "breathing_techniques": [
+        IndexSpec("id_unique", [("id", ASCENDING)], {"unique": True}),
+        IndexSpec("element_id", [("element", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("name_id", [("name", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("users_id", [("users", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("search", [("name", TEXT), ("description", TEXT), ("forms", TEXT)]),
+    ],
+    "story_arcs": [
+        IndexSpec("id_unique", [("id", ASCENDING)], {"unique": True}),
+        # Serves both sort("order") and the (order, id) keyset pagination seek
+        IndexSpec("order_id", [("order", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("title_id", [("title", ASCENDING), ("id", ASCENDING)]),
+        IndexSpec("search", [("title", TEXT), ("description", TEXT), ("key_events", TEXT)]),
+    ],
+    IDEMPOTENCY_COLLECTION: [
+        # Stored responses are dropped by the server once they expire
+        IndexSpec("expires", [("created_at", ASCENDING)], {"expireAfterSeconds": IDEMPOTENCY_TTL_SECONDS}),
+    ],
+    JOBS_COLLECTION: [
+        # Workers claim the oldest queued job, or a running one whose lease ran out
+        IndexSpec("status_created", [("status", ASCENDING), ("created_at", ASCENDING)]),
+        IndexSpec("status_lease", [("status", ASCENDING), ("lease_expires", ASCENDING)]),
+        # Only finished jobs have finished_at, so only they expire
+        IndexSpec("expires", [("finished_at", ASCENDING)], {"expireAfterSeconds": JOB_TTL_SECONDS}),
+    ],
+    JOB_EXPORTS_COLLECTION: [
+        IndexSpec("job_sequence", [("job_id", ASCENDING), ("sequence", ASCENDING)]),
+        IndexSpec("expires", [("created_at", ASCENDING)], {"expireAfterSeconds": JOB_TTL_SECONDS}),
+    ],
+}
+
+# Index options that change index behaviour and therefore count as drift
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "weights")
+
+
+@dataclass
+class IndexReport:
+    """Outcome of comparing the registry with one collection"""
+    collection: str
+    created: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    drifted: List[str] = field(default_factory=list)
+    unexpected: List[str] = field(default_factory=list)
+
+    @property
+    def in_sync(self) -> bool:
+        return not (self.missing or self.drifted or self.unexpected)
+
+
+def _normalise_keys(keys) -> List[Tuple[str, Any]]:
+    return [(name, int(direction) if isinstance(direction, float) else direction) for name, direction in keys]
+
+
+def _text_weights(spec: IndexSpec) -> Dict[str, int]:
+    weights = spec.options.get("weights", {})
+    return {name: weights.get(name, 1) for name, direction in spec.keys if direction == TEXT}
+
+
+def _describe_drift(spec: IndexSpec, existing: Dict[str, Any]) -> List[str]:
+    problems = []
+    options = COMPARED_OPTIONS
+    if _text_weights(spec):
+        # The server stores text indexes as _fts/_ftsx keys plus a weights
+        # document, so the weights are what identifies the indexed fields.
+        if dict(existing.get("weights") or {}) != _text_weights(spec):
+            problems.append(f"text fields {dict(existing.get('weights') or {})} != {_text_weights(spec)}")
+        options = tuple(option for option in COMPARED_OPTIONS if option != "weights")
+    elif _normalise_keys(existing["key"]) != _normalise_keys(spec.keys):
+        problems.append(f"keys {existing['key']} != {list(spec.keys)}")
+    for option in options:
+        if existing.get(option) != spec.options.get(option):
+            problems.append(f"{option} {existing.get(option)!r} != {spec.options.get(option)!r}")
+    return problems
+
+
+async def check_collection(db, collection: str, specs: List[IndexSpec], dry_run: bool = False) -> IndexReport:
+    """Create missing indexes for one collection and report any drift"""
+    report = IndexReport(collection)
+    existing = await db[collection].index_information()
+    declared = {spec.name for spec in specs}
+
+    for spec in specs:
+        if spec.name not in existing:
+            if dry_run:
+                report.missing.append(spec.name)
+                continue
+            try:
+                await db[collection].create_index(list(spec.keys), name=spec.name, **spec.options)
+                report.created.append(spec.name)
+            except OperationFailure as e:
+                # Typically an equivalent index under another name, or
+                # duplicate values blocking a unique index.
+                logger.error(f"Could not create index {collection}.{spec.name}: {e}")
+                report.missing.append(spec.name)
+            continue
+        problems = _describe_drift(spec, existing[spec.name])
+        if problems:
+            report.drifted.append(f"{spec.name} ({'; '.join(problems)})")
+
+    report.unexpected = sorted(name for name in existing if name != "_id_" and name not in declared)
+    return report
+
+
+async def ensure_indexes(db, dry_run: bool = False) -> List[IndexReport]:
+    """Bring every registered collection in line with INDEXES"""
+    reports = []
+    for collection, specs in INDEXES.items():
+        report = await check_collection(db, collection, specs, dry_run=dry_run)
+        for name in report.created:
+            logger.info(f"🗂️  Created index {collection}.{name}")
+        for name in report.missing:
+            logger.warning(f"Index {collection}.{name} is missing")
+        for description in report.drifted:
+            logger.warning(f"Index {collection}.{description} differs from the registry")
+        for name in report.unexpected:
+            logger.warning(f"Index {collection}.{name} is not declared in the registry")
+        reports.append(report)
+    return reports
+
+
+async def _main(dry_run: bool) -> int:
+    import database
+
+    try:
+        reports = await ensure_indexes(database.connect(), dry_run=dry_run)
+    finally:
+        database.close()
+
+    for report in reports:
+        status = "in sync" if report.in_sync else "DRIFT"
+        print(f"{report.collection}: {status}")
+        for label in ("created", "missing", "drifted", "unexpected"):
+            for item in getattr(report, label):
+                print(f"  {label}: {item}")
+    return 0 if all(report.in_sync for report in reports) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and check MongoDB indexes")
+    parser.add_argument("--dry-run", action="store_true", help="report missing indexes without creating them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    raise SystemExit(asyncio.run(_main(args.dry_run)))
@@ -0,0 +1,485 @@
+"""Background jobs stored in MongoDB.
+
+Heavy work (large imports, export builds, reindexing, reseeding) is queued
+in the jobs collection by POST /api/jobs and run by a pool of worker tasks.
+A worker claims a job atomically, holds a lease on it that a heartbeat
+keeps renewing, and saves a checkpoint after every chunk. If the worker dies,
+the lease runs out and another worker resumes the job from its last
+checkpoint.
+
+Workers run inside the API process by default, but only wait on MongoDB
+there: validating import chunks and encoding export chunks, the CPU-bound
+steps, run in the offload pool (see offload.py) so they never hold up the
+event loop serving requests. To move jobs out of the API process entirely,
+set JOB_WORKERS=0 on the API and run this module as a separate process:
+
+    python jobs.py --workers 2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from bulk import BULK_CHUNK_SIZE, validate_documents
+from cache_sync import notify_write
+from database import CHARACTERS, BREATHING_TECHNIQUES, STORY_ARCS
+from export import EXPORT_BATCH_SIZE, encode_ndjson
+from ids import new_id
+from metrics import jobs_finished
+from models import (
+    BreathingTechnique, BreathingTechniqueCreate, Character, CharacterCreate, Job, StoryArc, StoryArcCreate,
+)
+from offload import offloader
+from pagination import ID_SORT, STORY_ARC_SORT, fetch_page
+from projection import InvalidFields, mongo_projection, parse_fields
+from relations import backfill_relations, with_relations
+from seed import apply_seed
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "jobs"
+# NDJSON chunks written by export jobs, one document per chunk
+JOB_EXPORTS_COLLECTION = "job_exports"
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "2"))
+# A running job whose lease is not renewed in time is taken over by the
+# next worker that polls
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "30"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs and export chunks are dropped by TTL indexes (see indexes.py)
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", "604800"))
+# Import items are stored on the job document, which must stay under 16 MB
+MAX_IMPORT_ITEMS = int(os.environ.get("JOB_MAX_IMPORT_ITEMS", "10000"))
+MAX_REPORTED_ERRORS = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+CATALOG = {
+    CHARACTERS: (CharacterCreate, Character, ID_SORT),
+    BREATHING_TECHNIQUES: (BreathingTechniqueCreate, BreathingTechnique, ID_SORT),
+    STORY_ARCS: (StoryArcCreate, StoryArc, STORY_ARC_SORT),
+}
+
+_LEASE_FIELDS = {"lease_owner": "", "lease_expires": ""}
+
+
+class InvalidJob(ValueError):
+    """Raised when a submitted job has an unknown kind or bad parameters"""
+
+
+class LeaseLost(Exception):
+    """Raised when another worker has taken over a running job"""
+
+
+class JobContext:
+    """What a job handler sees: its parameters, its saved state and the database"""
+
+    def __init__(self, db, job: Dict[str, Any], owner: str, lease_seconds: float):
+        self.db = db
+        self.id = job["_id"]
+        self.params = job["params"]
+        self.progress: Dict[str, Any] = dict(job.get("progress") or {})
+        self.checkpoint: Dict[str, Any] = dict(job.get("checkpoint") or {})
+        self.lost = False
+        self._filter = {"_id": self.id, "lease_owner": owner}
+        self._lease_seconds = lease_seconds
+
+    async def save(self, checkpoint: Optional[Dict[str, Any]] = None, **progress):
+        """Record progress, and where to resume from, while renewing the lease"""
+        self.progress.update(progress)
+        update = {"progress": self.progress, "lease_expires": _lease_expiry(self._lease_seconds)}
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+            update["checkpoint"] = checkpoint
+        result = await self.db[JOBS_COLLECTION].update_one(self._filter, {"$set": update})
+        if not result.matched_count:
+            self.lost = True
+            raise LeaseLost(f"Job {self.id} was taken over by another worker")
+
+
+def _lease_expiry(lease_seconds: float) -> datetime:
+    return datetime.utcnow() + timedelta(seconds=lease_seconds)
+
+
+def _collection_param(params: Dict[str, Any]) -> str:
+    collection = params.get("collection")
+    if collection not in CATALOG:
+        raise InvalidJob(f"collection must be one of: {', '.join(CATALOG)}")
+    return collection
+
+
+def _import_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    collection = _collection_param(params)
+    items = params.get("items")
+    if not isinstance(items, list) or not items:
+        raise InvalidJob("items must be a non-empty array")
+    if len(items) > MAX_IMPORT_ITEMS:
+        raise InvalidJob(f"At most {MAX_IMPORT_ITEMS} items per import job")
+    # Ids are minted up front so a resumed import upserts the same documents
+    return {"collection": collection, "items": items, "ids": [new_id() for _ in items]}
+
+
+def _export_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    collection = _collection_param(params)
+    fields = params.get("fields")
+    if fields is not None and not isinstance(fields, str):
+        raise InvalidJob("fields must be a comma-separated string")
+    try:
+        parse_fields(CATALOG[collection][1], fields)
+    except InvalidFields as e:
+        raise InvalidJob(str(e))
+    return {"collection": collection, "fields": fields}
+
+
+def _reindex_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {}
+
+
+def _seed_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"force": bool(params.get("force", False))}
+
+
+async def _upsert_chunk(collection, writes: List[UpdateOne]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Run one chunk of upserts, returning how many inserted and the per-write errors"""
+    try:
+        result = await collection.bulk_write(writes, ordered=False)
+        return result.upserted_count, []
+    except BulkWriteError as e:
+        return e.details.get("nUpserted", 0), e.details.get("writeErrors", [])
+
+
+async def run_import(job: JobContext) -> Dict[str, Any]:
+    """Validate and insert the submitted items chunk by chunk"""
+    collection = job.params["collection"]
+    create_model, model, _ = CATALOG[collection]
+    items, ids = job.params["items"], job.params["ids"]
+    position = job.checkpoint.get("position", 0)
+    errors = job.checkpoint.get("errors", [])
+    inserted, failed = job.progress.get("inserted", 0), job.progress.get("failed", 0)
+
+    while position < len(items):
+        stop = min(position + BULK_CHUNK_SIZE, len(items))
+        validated = await offloader.run_sized(
+            stop - position, validate_documents, create_model, model, items[position:stop], ids[position:stop],
+        )
+        writes, indexes = [], []
+        for index, (document, error) in enumerate(validated, start=position):
+            if document is None:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"index": index, "error": error})
+                continue
+            # $setOnInsert turns a chunk replayed after a crash into a no-op
+            writes.append(UpdateOne({"id": ids[index]}, {"$setOnInsert": with_relations(collection, document)}, upsert=True))
+            indexes.append(index)
+
+        if writes:
+            upserted, write_errors = await _upsert_chunk(job.db[collection], writes)
+            rejected = {error["index"] for error in write_errors}
+            for error in write_errors:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"index": indexes[error["index"]], "error": error.get("errmsg", "Write failed")})
+            written = [ids[index] for position_in_chunk, index in enumerate(indexes) if position_in_chunk not in rejected]
+            # Documents a replayed chunk had already written match but are not upserted again
+            inserted += upserted
+            failed += len(rejected)
+            if written:
+                await notify_write(collection, written)
+
+        position = stop
+        await job.save({"position": position, "errors": errors},
+                       total=len(items), done=position, inserted=inserted, failed=failed)
+    return {"inserted": inserted, "failed": failed, "errors": errors}
+
+
+async def run_export(job: JobContext) -> Dict[str, Any]:
+    """Write a collection as NDJSON chunks that GET /api/jobs/{id}/result streams back"""
+    collection = job.params["collection"]
+    _, model, sort = CATALOG[collection]
+    projection = mongo_projection(model, parse_fields(model, job.params["fields"]))
+    names = [name for name in projection if name != "_id"]
+    after, sequence = job.checkpoint.get("after"), job.checkpoint.get("sequence", 0)
+    done = job.progress.get("done", 0)
+    total = job.progress.get("total")
+    if total is None:
+        total = await job.db[collection].estimated_document_count()
+
+    while True:
+        documents, next_cursor = await fetch_page(job.db[collection], sort, EXPORT_BATCH_SIZE, after, projection=projection)
+        if documents:
+            # fetch_page also reads the sort keys; only the requested fields are exported
+            body = await offloader.run_sized(len(documents), encode_ndjson, documents, names)
+            # Keyed by sequence number, so a chunk rewritten after a crash replaces itself
+            await job.db[JOB_EXPORTS_COLLECTION].replace_one(
+                {"_id": f"{job.id}:{sequence:08d}"},
+                {"job_id": job.id, "sequence": sequence, "body": body, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+            sequence += 1
+            done += len(documents)
+        if next_cursor is None:
+            break
+        after = next_cursor
+        await job.save({"after": after, "sequence": sequence}, total=total, done=done)
+    job.progress.update(total=total, done=done)
+    return {"documents": done, "chunks": sequence}
+
+
+async def run_reindex(job: JobContext) -> Dict[str, Any]:
+    """Bring indexes in line with the registry and backfill relationship keys"""
+    # indexes.py declares this module's collections, so import it late
+    from indexes import ensure_indexes
+
+    reports = await ensure_indexes(job.db)
+    await job.save(total=2, done=1)
+    backfilled = await backfill_relations(job.db)
+    if backfilled:
+        await notify_write(CHARACTERS)
+    return {
+        "indexes": {
+            report.collection: {"created": report.created, "missing": report.missing, "drifted": report.drifted}
+            for report in reports
+        },
+        "backfilled": backfilled,
+    }
+
+
+async def run_seed(job: JobContext) -> Dict[str, Any]:
+    """Apply the versioned sample data, as seed.py does"""
+    applied = await apply_seed(job.db, force=job.params["force"])
+    if applied:
+        for collection in CATALOG:
+            await notify_write(collection)
+    return {"applied": applied}
+
+
+Handler = Callable[[JobContext], Awaitable[Dict[str, Any]]]
+
+# kind -> (parameter validation run on submit, handler run by a worker)
+JOB_KINDS: Dict[str, Tuple[Callable[[Dict[str, Any]], Dict[str, Any]], Handler]] = {
+    "import": (_import_params, run_import),
+    "export": (_export_params, run_export),
+    "reindex": (_reindex_params, run_reindex),
+    "seed": (_seed_params, run_seed),
+}
+
+
+async def submit_job(db, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and queue a job, returning the stored job document"""
+    if kind not in JOB_KINDS:
+        raise InvalidJob(f"Unknown job kind {kind!r}; expected one of: {', '.join(JOB_KINDS)}")
+    validate, _ = JOB_KINDS[kind]
+    job = {
+        "_id": new_id(),
+        "kind": kind,
+        "params": validate(params),
+        "status": QUEUED,
+        "attempts": 0,
+        "progress": {"done": 0},
+        "checkpoint": {},
+        "created_at": datetime.utcnow(),
+    }
+    await db[JOBS_COLLECTION].insert_one(job)
+    job_queue.wake()
+    return job
+
+
+async def find_job(db, job_id: str) -> Optional[Dict[str, Any]]:
+    # Import items are only needed by the worker
+    return await db[JOBS_COLLECTION].find_one({"_id": job_id}, {"params": 0, "checkpoint": 0})
+
+
+def job_view(job: Dict[str, Any]) -> Job:
+    """The public shape of a stored job"""
+    return Job(id=job["_id"], **{name: value for name, value in job.items() if name in Job.model_fields and name != "id"})
+
+
+async def iter_export(db, job_id: str) -> AsyncIterator[bytes]:
+    """Stream the NDJSON written by an export job, chunk by chunk"""
+    cursor = db[JOB_EXPORTS_COLLECTION].find({"job_id": job_id}, {"body": 1}).sort("sequence", 1).batch_size(16)
+    try:
+        async for chunk in cursor:
+            yield chunk["body"]
+    finally:
+        await cursor.close()
+
+
+class JobQueue:
+    """Pool of worker tasks claiming and running jobs from the jobs collection"""
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self, db):
+        if self.workers > 0 and not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._work(db)) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back on the queue"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wakeup = None
+
+    def wake(self):
+        """Let idle local workers look for a job without waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, db):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim(db)
+            except PyMongoError as e:
+                logger.warning(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(db, job)
+            except PyMongoError as e:
+                # The lease runs out and the job is picked up again
+                logger.warning(f"Could not record the outcome of job {job['_id']}: {e}")
+
+    async def _claim(self, db) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await db[JOBS_COLLECTION].find_one_and_update(
+            {"$or": [{"status": QUEUED}, {"status": RUNNING, "lease_expires": {"$lt": now}}]},
+            {
+                "$set": {"status": RUNNING, "lease_owner": self.owner, "lease_expires": _lease_expiry(self.lease_seconds),
+                         "started_at": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _finish(self, jobs, job, status: str, **fields):
+        update = {"$set": {"status": status, "finished_at": datetime.utcnow(), **fields}, "$unset": _LEASE_FIELDS}
+        if status == SUCCEEDED:
+            update["$unset"] = {**_LEASE_FIELDS, "checkpoint": "", "params.items": "", "params.ids": ""}
+        await jobs.update_one({"_id": job["_id"], "lease_owner": self.owner}, update)
+        jobs_finished.inc(job["kind"], status)
+
+    async def _execute(self, db, job: Dict[str, Any]):
+        jobs = db[JOBS_COLLECTION]
+        if job["attempts"] > self.max_attempts:
+            await self._finish(jobs, job, FAILED, error=f"Gave up after {self.max_attempts} attempts")
+            return
+
+        _, handler = JOB_KINDS[job["kind"]]
+        context = JobContext(db, job, self.owner, self.lease_seconds)
+        work = asyncio.create_task(handler(context))
+        heartbeat = asyncio.create_task(self._heartbeat(jobs, context, work))
+        logger.info(f"Running {job['kind']} job {job['_id']} (attempt {job['attempts']})")
+        try:
+            result = await work
+        except (asyncio.CancelledError, LeaseLost):
+            if not context.lost:
+                # Shutting down: hand the job back without using up an attempt
+                work.cancel()
+                await jobs.update_one(
+                    {"_id": job["_id"], "lease_owner": self.owner},
+                    {"$set": {"status": QUEUED}, "$unset": _LEASE_FIELDS, "$inc": {"attempts": -1}},
+                )
+                raise
+            logger.warning(f"Lost the lease on job {job['_id']}; another worker will resume it")
+            return
+        except Exception as e:
+            logger.exception(f"Job {job['_id']} failed")
+            if job["attempts"] >= self.max_attempts:
+                await self._finish(jobs, job, FAILED, error=str(e) or type(e).__name__)
+            else:
+                # Retried from the last checkpoint by the next worker to poll
+                await jobs.update_one(
+                    {"_id": job["_id"], "lease_owner": self.owner},
+                    {"$set": {"status": QUEUED, "error": str(e) or type(e).__name__}, "$unset": _LEASE_FIELDS},
+                )
+                jobs_finished.inc(job["kind"], "retried")
+            return
+        finally:
+            heartbeat.cancel()
+        await self._finish(jobs, job, SUCCEEDED, result=result, progress=context.progress, error=None)
+        logger.info(f"Finished {job['kind']} job {job['_id']}")
+
+    async def _heartbeat(self, jobs, context: JobContext, work: asyncio.Task):
+        """Renew the lease while the handler runs; stop it if the lease was lost"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await jobs.update_one(
+                    {"_id": context.id, "lease_owner": self.owner},
+                    {"$set": {"lease_expires": _lease_expiry(self.lease_seconds)}},
+                )
+            except PyMongoError as e:
+                logger.warning(f"Could not renew the lease on job {context.id}: {e}")
+                continue
+            if not renewed.matched_count:
+                context.lost = True
+                work.cancel()
+                return
+
+
+job_queue = JobQueue()
+
+
+async def _main(workers: int) -> int:
+    import database
+
+    queue = JobQueue(workers=workers)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    queue.start(database.connect())
+    logger.info(f"Job worker {queue.owner} running {workers} worker(s)")
+    try:
+        await stop.wait()
+    finally:
+        await queue.stop()
+        await offloader.shutdown()
+        database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background job workers without the API")
+    parser.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1), help="jobs to run concurrently")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    raise SystemExit(asyncio.run(_main(args.workers)))
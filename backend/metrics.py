@@ -0,0 +1,357 @@
+import asyncio
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Metrics are kept in-process and rendered in the Prometheus text format at
+# /api/metrics. Each worker reports its own numbers; Prometheus adds them up.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# How often the event loop lag probe wakes up
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get("LOOP_LAG_INTERVAL_SECONDS", "0.25"))
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """A metric family with a fixed set of label names"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """One exposition line per sample"""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, *labels: str, value: float):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - started)
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {running}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {running}"
+
+
+class CallbackMetric(Metric):
+    """A counter or gauge whose samples are read from a function at scrape time"""
+
+    def __init__(self, name, help, type: str, labels=(), collect: Callable[[], Dict[LabelValues, float]] = dict):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect().items():
+            if value is not None:
+                yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status code",
+    ("method", "route", "status"),
+))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last body byte",
+    ("method", "route"),
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("method",),
+))
+mongo_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trips as reported by the driver",
+    ("command",),
+))
+mongo_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error", ("command",),
+))
+stage_duration = registry.register(Histogram(
+    "app_stage_duration_seconds", "Time spent per stage when building an uncached response",
+    ("stage",),
+))
+jobs_finished = registry.register(Counter(
+    "app_jobs_finished_total", "Background job attempts run by this worker, by kind and outcome",
+    ("kind", "status"),
+))
+event_loop_lag = registry.register(Histogram(
+    "app_event_loop_lag_seconds", "How late the event loop woke a task sleeping for a fixed interval",
+))
+offload_in_flight = registry.register(Gauge(
+    "app_offload_in_flight", "Payloads being encoded off the event loop, including those waiting for a slot",
+    ("executor",),
+))
+
+
+def stage_timer(stage: str):
+    """Time one stage of response building: query, validate (or decode), serialize, or offload for both"""
+    return stage_duration.time(stage)
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Feeds pymongo command monitoring events into the Mongo histograms"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_duration.observe(event.command_name, value=event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongo_duration.observe(event.command_name, value=event.duration_micros / 1e6)
+        mongo_failures.inc(event.command_name)
+
+
+command_listener = CommandTimingListener()
+
+
+class LoopLagMonitor:
+    """Background probe measuring how long the event loop is held up.
+
+    The task sleeps for a fixed interval and records how much later than
+    that it actually woke. Anything hogging the loop (CPU-bound encoding, a
+    blocking call) shows up here, and every request in the worker waits
+    out the same delay.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if METRICS_ENABLED and self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            event_loop_lag.observe(value=max(0.0, loop.time() - started - self.interval))
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts, latency and concurrency.
+
+    Requests are labelled with the route template ("/api/characters/{character_id}")
+    rather than the raw path so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[Dict[Callable, str]] = None
+
+    def _route_template(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            self._route_paths = {
+                getattr(r, "endpoint", None): r.path for r in scope["app"].routes if hasattr(r, "path")
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            # The router fills in the matched endpoint on the shared scope
+            route = self._route_template(scope)
+            http_duration.observe(method, route, value=time.perf_counter() - started)
+            http_requests.inc(method, route, status)
+
+
+def register_cache_metrics(cache):
+    """Expose a cache's per-namespace counters"""
+    def counter(field):
+        return lambda: {(ns,): stats[field] for ns, stats in cache.stats()["namespaces"].items()}
+
+    for field in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        registry.register(CallbackMetric(
+            f"cache_{field}_total", f"Catalog cache {field} per namespace", "counter", ("namespace",), counter(field),
+        ))
+    registry.register(CallbackMetric(
+        "cache_hit_ratio", "Catalog cache hits over lookups per namespace", "gauge", ("namespace",), counter("hit_ratio"),
+    ))
+    registry.register(CallbackMetric(
+        "cache_entries", "Entries held by the catalog cache", "gauge", (),
+        lambda: {(): cache.stats().get("entries", 0)},
+    ))
+
+
+def register_pool_metrics(listener):
+    """Expose the connection pool checkout statistics"""
+    def scalar(field):
+        return lambda: {(): listener.snapshot()[field]}
+
+    def by_key(field):
+        return lambda: {(key,): value for key, value in listener.snapshot()[field].items()}
+
+    registry.register(CallbackMetric(
+        "mongodb_pool_checkout_attempts_total", "Connection checkouts attempted", "counter", (), scalar("checkout_attempts"),
+    ))
+    registry.register(CallbackMetric(
+        "mongodb_pool_checkout_wait_seconds_total", "Time spent waiting for a pooled connection", "counter", (),
+        scalar("wait_seconds_total"),
+    ))
+    registry.register(CallbackMetric(
+        "mongodb_pool_checkout_failures_total", "Failed checkouts by reason", "counter", ("reason",),
+        by_key("checkout_failures"),
+    ))
+    registry.register(CallbackMetric(
+        "mongodb_pool_connections_in_use", "Connections checked out per server", "gauge", ("address",), by_key("in_use"),
+    ))
+    registry.register(CallbackMetric(
+        "mongodb_pool_connections_open", "Open connections per server", "gauge", ("address",), by_key("open_connections"),
+    ))
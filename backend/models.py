@@ -1,10 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-import uuid
+from ids import new_id
 
 class Character(BaseModel):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: Optional[str] = Field(default_factory=new_id)
     name: str
     description: str
     breathing: str
@@ -13,6 +13,8 @@ class Character(BaseModel):
     abilities: List[str]
     personality: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Set when a PUT replaces the document; drives Last-Modified
+    updated_at: Optional[datetime] = None
 
 class CharacterCreate(BaseModel):
     name: str
@@ -24,7 +26,7 @@ class CharacterCreate(BaseModel):
     personality: str
 
 class BreathingTechnique(BaseModel):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: Optional[str] = Field(default_factory=new_id)
     name: str
     description: str
     forms: List[str]
@@ -32,6 +34,7 @@ class BreathingTechnique(BaseModel):
     color: str
     element: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
 
 class BreathingTechniqueCreate(BaseModel):
     name: str
@@ -42,7 +45,7 @@ class BreathingTechniqueCreate(BaseModel):
     element: str
 
 class StoryArc(BaseModel):
-    id: Optional[str] = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: Optional[str] = Field(default_factory=new_id)
     title: str
     description: str
     episodes: str
@@ -50,6 +53,7 @@ class StoryArc(BaseModel):
     image: str
     order: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
 
 class StoryArcCreate(BaseModel):
     title: str
@@ -57,4 +61,37 @@ class StoryArcCreate(BaseModel):
     episodes: str
     key_events: List[str]
     image: str
-    order: int
\ No newline at end of file
+    order: int
+
+class CharacterGraph(Character):
+    techniques: List[BreathingTechnique] = []
+
+class BreathingTechniqueGraph(BreathingTechnique):
+    characters: List[Character] = []
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    results: List[BulkItemResult] = Field(default_factory=list)
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str
+    attempts: int = 0
+    progress: Dict[str, Any] = Field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
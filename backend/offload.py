@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from metrics import offload_in_flight
+from read_models import row_factory
+from serialization import EncodedBody, encode_page
+
+logger = logging.getLogger(__name__)
+
+# Pages with at least this many rows are validated and encoded in a pool
+# instead of on the event loop thread, so smaller requests in the same
+# worker are not stuck behind them; 0 turns offloading off
+OFFLOAD_THRESHOLD = int(os.environ.get("OFFLOAD_THRESHOLD", "500"))
+# thread, process, or auto: threads on a free-threaded (no-GIL) build, where
+# they really run in parallel, processes otherwise
+OFFLOAD_EXECUTOR = os.environ.get("OFFLOAD_EXECUTOR", "auto").lower()
+OFFLOAD_WORKERS = int(os.environ.get("OFFLOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Payloads allowed in the pool or its queue at once; further requests wait
+# their turn instead of piling work (and pickled rows) into the queue
+OFFLOAD_MAX_PENDING = int(os.environ.get("OFFLOAD_MAX_PENDING", str(OFFLOAD_WORKERS * 2)))
+
+if OFFLOAD_EXECUTOR not in ("auto", "thread", "process"):
+    raise ValueError(f"Unknown OFFLOAD_EXECUTOR: {OFFLOAD_EXECUTOR}")
+
+
+def gil_disabled() -> bool:
+    """True on a free-threaded build running with the GIL off"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def executor_kind() -> str:
+    if OFFLOAD_EXECUTOR == "auto":
+        return "thread" if gil_disabled() else "process"
+    return OFFLOAD_EXECUTOR
+
+
+def encode_documents(model: Type[BaseModel], fields: Optional[List[str]], documents: List[Dict[str, Any]],
+                     next_cursor: Optional[str] = None) -> EncodedBody:
+    """Build and encode one page of stored documents; runs inline or in the pool"""
+    build = row_factory(model, fields)
+    return encode_page([build(document) for document in documents], next_cursor)
+
+
+class Offloader:
+    """Runs CPU-bound page encoding in a thread or process pool"""
+
+    def __init__(
+        self,
+        threshold: int = OFFLOAD_THRESHOLD,
+        workers: int = OFFLOAD_WORKERS,
+        max_pending: int = OFFLOAD_MAX_PENDING,
+        kind: Optional[str] = None,
+    ):
+        self.threshold = threshold
+        self.workers = workers
+        self.kind = kind or executor_kind()
+        self._max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def should_offload(self, rows: int) -> bool:
+        return self.threshold > 0 and rows >= self.threshold
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "thread":
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="offload")
+            else:
+                # spawn rather than fork: the parent has driver and pool threads
+                # running, which a forked child would inherit in a broken state
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) in the pool, waiting for a free slot first.
+
+        fn and its arguments must be picklable for the process pool. If a
+        pool process dies, the pool is replaced and this call runs inline.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+        offload_in_flight.inc(self.kind)
+        try:
+            async with self._slots:
+                pool = self._pool()
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+                except BrokenProcessPool:
+                    logger.warning("Offload pool broke; starting a new one")
+                    if self._executor is pool:
+                        self._executor = None
+                        pool.shutdown(wait=False, cancel_futures=True)
+                    return fn(*args)
+        finally:
+            offload_in_flight.dec(self.kind)
+
+    async def run_sized(self, rows: int, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) in the pool if `rows` is enough to offload, inline otherwise"""
+        if self.should_offload(rows):
+            return await self.run(fn, *args)
+        return fn(*args)
+
+    async def shutdown(self):
+        """Stop the pool, waiting for its workers to exit.
+
+        Waiting happens in a thread so the loop keeps running; returning
+        early would leave worker processes and their pipes to be torn down
+        during interpreter exit.
+        """
+        executor, self._executor = self._executor, None
+        self._slots = None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+offloader = Offloader()
@@ -0,0 +1,98 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Page size bounds for the list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Default sort keys used for keyset pagination, per collection. The last key
+# must be unique so that every document has a stable position in the ordering.
+SortSpec = Sequence[Tuple[str, int]]
+
+ID_SORT: SortSpec = (("id", 1),)
+STORY_ARC_SORT: SortSpec = (("order", 1), ("id", 1))
+
+
+# What encode_cursor writes for a sort key (datetimes are written as strings)
+CURSOR_VALUE_TYPES = (str, int, float, bool)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor that cannot be decoded"""
+
+
+def sort_signature(sort: SortSpec) -> str:
+    """Compact text form of a sort spec, e.g. "-rank,name,id" """
+    return ",".join(("" if direction == 1 else "-") + field for field, direction in sort)
+
+
+def encode_cursor(values: Sequence[Any], sort: SortSpec) -> str:
+    """Encode the sort-key values of the last row into an opaque cursor"""
+    raw = json.dumps([sort_signature(sort), list(values)], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    """Decode a cursor produced by encode_cursor for the given sort keys"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        signature, values = payload
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    # A cursor is only meaningful for the ordering that produced it
+    if signature != sort_signature(sort) or not isinstance(values, list) or len(values) != len(sort):
+        raise InvalidCursor("Cursor does not match the requested ordering")
+    # Values are spliced into the query, so anything but a plain sort-key
+    # value (e.g. {"$ne": null}) would be read as an operator
+    if not all(value is None or isinstance(value, CURSOR_VALUE_TYPES) for value in values):
+        raise InvalidCursor("Cursor values must be strings, numbers, booleans or null")
+    return values
+
+
+def keyset_filter(sort: SortSpec, values: Sequence[Any]) -> Dict[str, Any]:
+    """Build a query matching every row strictly after `values` in `sort` order.
+
+    For keys (a, b) this expands to {a > va} OR {a == va AND b > vb}, which
+    Mongo can answer with a range scan on a compound index over the same keys.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def cursor_for(document: Dict[str, Any], sort: SortSpec) -> str:
+    """Build the cursor pointing just past `document`"""
+    return encode_cursor([document.get(field) for field, _ in sort], sort)
+
+
+async def fetch_page(
+    collection,
+    sort: SortSpec,
+    limit: int,
+    after: Optional[str] = None,
+    query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, int]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of documents and the cursor for the next page, if any"""
+    query = dict(query or {})
+    if after:
+        seek = keyset_filter(sort, decode_cursor(after, sort))
+        query = {"$and": [query, seek]} if query else seek
+
+    if projection is not None:
+        # The cursor is built from the sort keys, so they must always be read
+        projection = {**projection, **{field: 1 for field, _ in sort}}
+
+    # Ask for one extra row so we know whether another page exists without
+    # running a separate count.
+    documents = await collection.find(query, projection).sort(list(sort)).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = cursor_for(documents[-1], sort)
+    return documents, next_cursor
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Dict, List
+
+from pymongo import monitoring
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """Records how long operations wait to check a connection out of the pool.
+
+    pymongo checks connections out synchronously on the calling thread, so
+    the start time is kept per thread and per server address and matched
+    with the checked-out or check-out-failed event that follows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkout_attempts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.bucket_counts = [0] * len(WAIT_BUCKETS)
+        self.failures: Dict[str, int] = {}
+        self.in_use: Dict[str, int] = {}
+        self.open_connections: Dict[str, int] = {}
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _started(self) -> Dict:
+        started = getattr(self._local, "started", None)
+        if started is None:
+            started = self._local.started = {}
+        return started
+
+    def _observe_wait(self, event) -> None:
+        started_at = self._started().pop(event.address, None)
+        if started_at is None:
+            return
+        waited = time.perf_counter() - started_at
+        with self._lock:
+            self.checkout_attempts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    def _adjust(self, counter: Dict[str, int], event, delta: int) -> None:
+        address = self._address(event)
+        with self._lock:
+            counter[address] = counter.get(address, 0) + delta
+
+    def connection_check_out_started(self, event):
+        self._started()[event.address] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        self._observe_wait(event)
+        self._adjust(self.in_use, event, 1)
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait(event)
+        with self._lock:
+            self.failures[event.reason] = self.failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        self._adjust(self.in_use, event, -1)
+
+    def connection_created(self, event):
+        self._adjust(self.open_connections, event, 1)
+
+    def connection_closed(self, event):
+        self._adjust(self.open_connections, event, -1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> Dict:
+        """Point-in-time copy of the pool statistics"""
+        with self._lock:
+            cumulative: List[Dict] = []
+            running = 0
+            for bound, count in zip(WAIT_BUCKETS, self.bucket_counts):
+                running += count
+                cumulative.append({"le": bound, "count": running})
+            return {
+                "checkout_attempts": self.checkout_attempts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkout_attempts, 6) if self.checkout_attempts else None,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_histogram": cumulative,
+                "checkout_failures": dict(self.failures),
+                "in_use": dict(self.in_use),
+                "open_connections": dict(self.open_connections),
+            }
+
+
+pool_listener = PoolCheckoutListener()
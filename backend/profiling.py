@@ -0,0 +1,213 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    # Optional: wall-clock, async-aware profiles rendered as HTML flame views
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+# Requests are only ever profiled when PROFILING_ENABLED is set. A profile is
+# then taken when the request carries the X-Profile header (matching
+# PROFILE_TOKEN if one is configured) or is picked by PROFILE_SAMPLE_RATE.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "demon-slayer-profiles")))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+PROFILER = os.environ.get("PROFILER", "pyinstrument" if PyinstrumentProfiler else "cprofile").lower()
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Paths never profiled: fetching profiles must not evict them, and event
+# streams stay open far longer than any request worth profiling
+EXCLUDED_PREFIXES = ("/api/profiles", "/api/metrics", "/api/events")
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of request profiles.
+
+    Each profile is stored as a data file plus a JSON sidecar with the request
+    details; once more than `keep` profiles exist the oldest are deleted.
+    """
+
+    def __init__(self, directory: Path, keep: int):
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _meta_paths(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        # Names start with a millisecond timestamp, so they sort oldest first
+        return sorted(self.directory.glob("*.json"))
+
+    def save(self, data: bytes, extension: str, meta: Dict[str, Any], profile_id: Optional[str] = None) -> str:
+        profile_id = profile_id or uuid.uuid4().hex
+        stem = f"{int(time.time() * 1000):013d}-{profile_id}"
+        meta = {**meta, "id": profile_id, "format": extension, "file": f"{stem}.{extension}"}
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / meta["file"]).write_bytes(data)
+            (self.directory / f"{stem}.json").write_text(json.dumps(meta))
+            for old in self._meta_paths()[:-max(self.keep, 1)]:
+                for path in self.directory.glob(f"{old.stem}.*"):
+                    path.unlink(missing_ok=True)
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Stored profile metadata, newest first"""
+        profiles = []
+        for path in reversed(self._meta_paths()):
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def find(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        for path in self.directory.glob(f"*-{profile_id}.json"):
+            meta = json.loads(path.read_text())
+            meta["path"] = self.directory / meta["file"]
+            return meta
+        return None
+
+
+def profile_as_text(path: Path, limit: int = 60) -> str:
+    """Top functions by cumulative time from a cProfile dump"""
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_KEEP)
+
+
+def token_matches(value: Optional[str]) -> bool:
+    """Whether a client-supplied value is the configured PROFILE_TOKEN"""
+    return value is not None and hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode())
+
+
+class _CProfileSession:
+    extension = "prof"
+
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+
+    def render(self) -> bytes:
+        with tempfile.NamedTemporaryFile(suffix=".prof") as f:
+            self._profiler.dump_stats(f.name)
+            return Path(f.name).read_bytes()
+
+
+class _PyinstrumentSession:
+    extension = "html"
+
+    def __init__(self):
+        self._profiler = PyinstrumentProfiler(async_mode="enabled")
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self):
+        self._profiler.stop()
+
+    def render(self) -> bytes:
+        return self._profiler.output_html().encode()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that profiles selected requests.
+
+    cProfile hooks the whole interpreter, so only one request is profiled at
+    a time; a request selected while another profile runs is served normally.
+    Under cProfile other requests interleaved on the event loop show up in
+    the profile too, which pyinstrument's async mode avoids.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+        self._busy = threading.Lock()
+
+    def _save(self, session, meta: Dict[str, Any], profile_id: str):
+        self.store.save(session.render(), session.extension, meta, profile_id)
+
+    def _wanted(self, scope) -> bool:
+        path = scope["path"]
+        if not path.startswith("/api") or path.startswith(EXCLUDED_PREFIXES):
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                value = value.decode("latin-1")
+                return token_matches(value) if PROFILE_TOKEN else value.lower() in ("1", "true", "yes")
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER.encode(), profile_id.encode())]
+            await send(message)
+
+        session = _PyinstrumentSession() if PROFILER == "pyinstrument" and PyinstrumentProfiler else _CProfileSession()
+        try:
+            session.start()
+        except ValueError:
+            # Another profiler already holds the interpreter's hooks
+            self._busy.release()
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                session.stop()
+            duration = time.perf_counter() - started
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }
+            # Rendering and writing the profile take long enough to stall
+            # every other request, so they run off the event loop
+            await asyncio.to_thread(self._save, session, meta, profile_id)
+        finally:
+            self._busy.release()
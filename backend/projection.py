@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, create_model
+
+
+class InvalidFields(ValueError):
+    """Raised when a fields= parameter names fields the model does not have"""
+
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= parameter, or None for every field"""
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so clients can address what they received
+    return ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+
+def mongo_projection(model: Type[BaseModel], fields: Optional[List[str]]) -> Dict[str, int]:
+    """Projection returning only the model's (or the requested) fields"""
+    names = fields if fields is not None else list(model.model_fields)
+    projection = {name: 1 for name in names}
+    projection["_id"] = 0
+    return projection
+
+
+@lru_cache(maxsize=64)
+def _partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    # Fields missing from a stored document come back as null rather than
+    # failing validation, since they were never filled in by a default.
+    definitions = {name: (Optional[model.model_fields[name].annotation], None) for name in fields}
+    return create_model(f"{model.__name__}Partial", **definitions)
+
+
+def partial_model(model: Type[BaseModel], fields: Optional[List[str]]) -> Type[BaseModel]:
+    """Response model restricted to the requested fields"""
+    if fields is None:
+        return model
+    return _partial_model(model, tuple(fields))
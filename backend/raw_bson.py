@@ -0,0 +1,50 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import bson
+import orjson
+from bson.raw_bson import RawBSONDocument
+
+from serialization import EncodedBody, make_etag
+
+# Opt-in: serve list pages straight from the BSON the server sent back.
+# Motor hands over each document as an undecoded RawBSONDocument; a page is
+# then decoded in a single C call and encoded in a single orjson call, with
+# no per-document Python work in between. Bodies are byte-identical to the
+# read-model path, so ETags do not change when this is switched on.
+RAW_BSON_READS = os.environ.get("RAW_BSON_READS", "false").lower() in ("1", "true", "yes")
+
+
+def raw_collection(collection):
+    """The same collection, returning RawBSONDocuments instead of dicts"""
+    return collection.with_options(codec_options=collection.codec_options.with_options(document_class=RawBSONDocument))
+
+
+def raw_batch(documents: Sequence[RawBSONDocument]) -> bytes:
+    """The documents' BSON back to back, as one buffer"""
+    return b"".join(document.raw for document in documents)
+
+
+def decode_rows(documents: Sequence[RawBSONDocument], names: Sequence[str], codec_options) -> List[Dict[str, Any]]:
+    """Decode raw documents into response rows holding exactly `names`, in order"""
+    return decode_batch(raw_batch(documents), names, codec_options)
+
+
+def decode_batch(data: bytes, names: Sequence[str], codec_options) -> List[Dict[str, Any]]:
+    """decode_rows for documents already joined into one buffer"""
+    rows = bson.decode_all(data, codec_options)
+    names = tuple(names)
+    # Documents written through the API already store their fields in model
+    # order; anything else (extra sort keys, missing fields) is rebuilt
+    return [row if tuple(row) == names else {name: row.get(name) for name in names} for row in rows]
+
+
+def encode_raw_page(rows: List[Dict[str, Any]], next_cursor: Optional[str] = None) -> EncodedBody:
+    """Encode decoded rows of a list endpoint together with their ETag"""
+    body = orjson.dumps(rows)
+    return EncodedBody(body, make_etag(body), next_cursor=next_cursor)
+
+
+def encode_raw_batch(data: bytes, names: Sequence[str], codec_options, next_cursor: Optional[str] = None) -> EncodedBody:
+    """Decode and encode a joined page in one step, for the offload pool"""
+    return encode_raw_page(decode_batch(data, names, codec_options), next_cursor)
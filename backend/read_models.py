@@ -0,0 +1,97 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from models import BreathingTechnique, Character, StoryArc
+from projection import partial_model
+
+# Documents read back from MongoDB were validated on the way in, so the read
+# path does not need Pydantic: these frozen, slotted dataclasses are filled
+# positionally from the stored values with no defaults, factories or
+# coercion, and orjson serializes them natively. Field order matches the
+# Pydantic models so the encoded bytes (and ETags) are identical.
+# Fields absent from a stored document read as None.
+
+
+class _Record:
+    __slots__ = ()
+    _names: tuple = ()
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]):
+        return cls(*map(document.get, cls._names))
+
+
+def _read_model(cls):
+    cls = dataclass(frozen=True, slots=True)(cls)
+    cls._names = tuple(field.name for field in fields(cls))
+    return cls
+
+
+@_read_model
+class CharacterRecord(_Record):
+    id: str
+    name: str
+    description: str
+    breathing: str
+    rank: str
+    image: str
+    abilities: List[str]
+    personality: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+@_read_model
+class BreathingTechniqueRecord(_Record):
+    id: str
+    name: str
+    description: str
+    forms: List[str]
+    users: List[str]
+    color: str
+    element: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+@_read_model
+class StoryArcRecord(_Record):
+    id: str
+    title: str
+    description: str
+    episodes: str
+    key_events: List[str]
+    image: str
+    order: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+READ_MODELS: Dict[Type[BaseModel], Type[_Record]] = {
+    Character: CharacterRecord,
+    BreathingTechnique: BreathingTechniqueRecord,
+    StoryArc: StoryArcRecord,
+}
+
+# A field added to a model but not to its record would silently vanish from
+# responses (and change ETags), so refuse to start instead
+for _model, _record in READ_MODELS.items():
+    if _record._names != tuple(_model.model_fields):
+        raise TypeError(f"{_record.__name__} fields {_record._names} do not match {_model.__name__} {tuple(_model.model_fields)}")
+del _model, _record
+
+
+def row_factory(model: Type[BaseModel], fields: Optional[List[str]] = None) -> Callable[[Dict[str, Any]], Any]:
+    """Build response rows from stored documents.
+
+    Full documents use the read model; sparse fieldsets keep the partial
+    Pydantic model, which omits the fields that were not asked for.
+    """
+    record = READ_MODELS.get(model)
+    if fields is None and record is not None:
+        return record.from_document
+    response_model = partial_model(model, fields)
+    return lambda document: response_model(**document)
@@ -0,0 +1,111 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+# Characters store their breathing as free text ("Water Breathing & Sun
+# Breathing") and techniques list their users by name. On every write we
+# also store the split style names on the character as `breathing_styles`,
+# so both directions of the relationship are plain indexed equality joins:
+#
+#   character -> techniques: breathing_styles = technique.name
+#                            OR character.name in technique.users
+#   technique -> characters: the same two conditions from the other side
+
+BREATHING_SEPARATOR = "&"
+
+# Cap on related documents returned per side of an expansion; 0 disables it
+MAX_EXPANDED = int(os.environ.get("MAX_EXPANDED_RELATIONS", "200"))
+
+# Fields the two queries of an expansion are read into
+JOINED_SIDES = ("_by_style", "_by_user")
+
+EXPANSIONS = {
+    "characters": "techniques",
+    "breathing_techniques": "characters",
+}
+
+
+class InvalidExpansion(ValueError):
+    """Raised when expand= names a relationship the resource does not have"""
+
+
+def breathing_styles(breathing: str) -> List[str]:
+    """Split a character's breathing text into technique names"""
+    return [style.strip() for style in (breathing or "").split(BREATHING_SEPARATOR) if style.strip()]
+
+
+def with_relations(collection: str, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the precomputed relationship keys to a document about to be written"""
+    if collection == "characters":
+        document["breathing_styles"] = breathing_styles(document.get("breathing", ""))
+    return document
+
+
+async def backfill_relations(db, batch_size: int = 1000) -> int:
+    """Compute breathing_styles for characters written before it existed"""
+    updated = 0
+    batch = []
+    cursor = db.characters.find({"breathing_styles": {"$exists": False}}, {"_id": 1, "breathing": 1})
+    async for document in cursor:
+        batch.append(UpdateOne(
+            {"_id": document["_id"]},
+            {"$set": {"breathing_styles": breathing_styles(document.get("breathing", ""))}},
+        ))
+        if len(batch) >= batch_size:
+            updated += (await db.characters.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await db.characters.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+def parse_expand(collection: str, expand: Optional[str], fields: Optional[str] = None) -> Optional[str]:
+    """Validate an expand= parameter for the given collection"""
+    if not expand:
+        return None
+    if fields:
+        # Graph responses are always whole documents
+        raise InvalidExpansion("expand cannot be combined with fields")
+    allowed = EXPANSIONS.get(collection)
+    if expand != allowed:
+        raise InvalidExpansion(f"Cannot expand {expand!r}; allowed: {allowed}")
+    return expand
+
+
+def _related_queries(collection: str, document: Dict[str, Any]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    # Each side is its own indexed find, so the cap is applied by the query
+    # rather than after a $lookup has built the whole join into one document
+    if collection == "characters":
+        return {
+            "_by_style": ("breathing_techniques", {"name": {"$in": document.get("breathing_styles", [])}}),
+            "_by_user": ("breathing_techniques", {"users": document.get("name")}),
+        }
+    return {
+        "_by_style": ("characters", {"breathing_styles": document.get("name")}),
+        "_by_user": ("characters", {"name": {"$in": document.get("users", [])}}),
+    }
+
+
+def merge_joined(document: Dict[str, Any], target: str) -> Dict[str, Any]:
+    """Fold the two lookup results into one de-duplicated, id-ordered list"""
+    related = {}
+    for side in JOINED_SIDES:
+        for item in document.pop(side, []):
+            item.pop("_id", None)
+            item.pop("breathing_styles", None)
+            related.setdefault(item.get("id"), item)
+    document[target] = sorted(related.values(), key=lambda item: str(item.get("id")))
+    return document
+
+
+async def fetch_graph(db, collection: str, document_id: str) -> Optional[Dict[str, Any]]:
+    """Resolve a character or technique together with its related documents"""
+    document = await db[collection].find_one({"id": document_id}, {"_id": 0})
+    if document is None:
+        return None
+    for side, (source, query) in _related_queries(collection, document).items():
+        # Sorted so a capped side returns the same documents on every replica
+        cursor = db[source].find(query, {"_id": 0, "breathing_styles": 0}).sort("id", 1).limit(MAX_EXPANDED)
+        document[side] = await cursor.to_list(None)
+    return merge_joined(document, EXPANSIONS[collection])
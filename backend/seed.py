@@ -0,0 +1,167 @@
+"""Versioned sample data applied with bulk upserts.
+
+The documents live in fixtures/ as JSON, described by fixtures/manifest.json.
+A single marker document in the meta collection records the fixture version
+last applied and the ids it seeded, so a worker booting against a seeded
+database does one _id lookup and nothing else. Bump "version" in the
+manifest when fixtures are added. Sample documents are only ever inserted:
+once seeded, edits to them are kept and deleting one is final, unless the
+seed is forced. A collection that already holds data the seed did not put
+there gets no samples unless SEED_SAMPLE_DATA is set, so real deployments
+are never mixed with fixture rows. To apply the fixtures without starting
+the app:
+
+    python seed.py [--force]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from relations import backfill_relations, with_relations
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Insert samples even into collections that already hold other data
+SEED_SAMPLE_DATA = os.environ.get("SEED_SAMPLE_DATA", "false").lower() in ("1", "true", "yes")
+
+META_COLLECTION = "meta"
+SEED_MARKER_ID = "seed"
+
+
+@dataclass(frozen=True)
+class Fixtures:
+    version: int
+    # Stamped on documents the seed inserts, so every worker and every boot
+    # produces the same created_at (and therefore the same ETags)
+    created_at: datetime
+    documents: Dict[str, List[Dict[str, Any]]]
+
+
+def load_fixtures(directory: Path = FIXTURES_DIR) -> Fixtures:
+    """Read the manifest and every fixture file it lists"""
+    manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+    documents = {
+        collection: json.loads((directory / filename).read_text(encoding="utf-8"))
+        for collection, filename in manifest["collections"].items()
+    }
+    return Fixtures(manifest["version"], datetime.fromisoformat(manifest["created_at"]), documents)
+
+
+async def seeded_version(db) -> Optional[int]:
+    """Fixture version recorded by the last successful seed, if any"""
+    marker = await db[META_COLLECTION].find_one({"_id": SEED_MARKER_ID}, {"version": 1})
+    return marker.get("version") if marker else None
+
+
+async def seeded_ids(db) -> Dict[str, List[str]]:
+    """Ids of the sample documents seeded so far, by collection"""
+    marker = await db[META_COLLECTION].find_one({"_id": SEED_MARKER_ID}, {"ids": 1})
+    return marker.get("ids", {}) if marker else {}
+
+
+def _upserts(collection: str, documents: List[Dict[str, Any]], created_at: datetime) -> List[UpdateOne]:
+    # $setOnInsert only: a document that already exists is left as it is
+    return [
+        UpdateOne(
+            {"id": document["id"]},
+            {"$setOnInsert": {**with_relations(collection, dict(document)), "created_at": created_at}},
+            upsert=True,
+        )
+        for document in documents
+    ]
+
+
+async def backfill_created_at(db, collections, created_at: datetime) -> int:
+    """Stamp created_at on documents written before every write stored it.
+
+    Reads fill a missing created_at with null, so without this the ETag of
+    such a document depends on which code path built it.
+    """
+    updated = 0
+    for collection in collections:
+        result = await db[collection].update_many({"created_at": None}, {"$set": {"created_at": created_at}})
+        updated += result.modified_count
+    return updated
+
+
+async def _record_version(db, version: int, ids: Dict[str, List[str]]):
+    marker = {
+        "$max": {"version": version},
+        "$set": {"applied_at": datetime.utcnow()},
+        "$addToSet": {f"ids.{collection}": {"$each": seeded} for collection, seeded in ids.items()},
+    }
+    try:
+        await db[META_COLLECTION].update_one({"_id": SEED_MARKER_ID}, marker, upsert=True)
+    except DuplicateKeyError:
+        # Another worker created the marker between our find and upsert
+        await db[META_COLLECTION].update_one({"_id": SEED_MARKER_ID}, marker)
+
+
+async def apply_seed(db, fixtures: Optional[Fixtures] = None, force: bool = False) -> bool:
+    """Insert the fixtures that were never seeded unless this version was already applied.
+
+    Upserts are keyed on the unique id index, so workers racing through a
+    first boot converge on the same documents. force also restores sample
+    documents that were deleted. Returns whether anything ran.
+    """
+    fixtures = fixtures or load_fixtures()
+    version = await seeded_version(db)
+    if not force and version is not None and version >= fixtures.version:
+        return False
+
+    seeded = await seeded_ids(db)
+    already_seeded = {} if force else seeded
+    seeded_now = []
+    for collection, documents in fixtures.documents.items():
+        # Only collections that are empty or hold earlier samples get new ones
+        if not (SEED_SAMPLE_DATA or collection in seeded or await db[collection].find_one({}, {"_id": 1}) is None):
+            logger.info(f"Not seeding {collection}: it already holds data")
+            continue
+        seeded_now.append(collection)
+        skip = set(already_seeded.get(collection, ()))
+        documents = [document for document in documents if document["id"] not in skip]
+        if documents:
+            result = await db[collection].bulk_write(_upserts(collection, documents, fixtures.created_at), ordered=False)
+            logger.info(f"Seeded {collection}: {result.upserted_count} inserted")
+    # Documents written before breathing_styles and created_at were always
+    # stored are migrated here, once per fixture version, rather than
+    # scanned for on every boot
+    await backfill_relations(db)
+    await backfill_created_at(db, fixtures.documents.keys(), fixtures.created_at)
+    ids = {
+        collection: [document["id"] for document in documents]
+        for collection, documents in fixtures.documents.items() if collection in seeded_now
+    }
+    await _record_version(db, fixtures.version, ids)
+    logger.info(f"Seed data at version {fixtures.version}")
+    return True
+
+
+async def _main(force: bool) -> int:
+    import database
+
+    try:
+        applied = await apply_seed(database.connect(), force=force)
+    finally:
+        database.close()
+    print("applied" if applied else "already up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the versioned sample data")
+    parser.add_argument("--force", action="store_true", help="re-apply even if this version was already seeded")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    raise SystemExit(asyncio.run(_main(args.force)))
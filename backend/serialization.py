@@ -0,0 +1,78 @@
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """A response body encoded once and served as-is until the next write"""
+    body: bytes
+    etag: str
+    last_modified: Optional[datetime] = None
+    next_cursor: Optional[str] = None
+    # Requested ids that matched nothing, for batch lookups
+    missing_ids: Tuple[str, ...] = ()
+    # Compressed copies of body by content coding, filled in on first use and
+    # dropped together with the cache entry
+    compressed: Dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the encoded body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _plain(model):
+    # Read models (see read_models.py) are dataclasses orjson encodes natively
+    return model.model_dump() if isinstance(model, BaseModel) else model
+
+
+def encode_model(model: BaseModel) -> bytes:
+    """Encode one validated model to JSON bytes"""
+    return orjson.dumps(_plain(model))
+
+
+def encode_models(models: Iterable[BaseModel]) -> bytes:
+    """Encode a list of validated models to a JSON array"""
+    return orjson.dumps([_plain(model) for model in models])
+
+
+def _last_modified(model: BaseModel) -> Optional[datetime]:
+    # Replaced documents carry updated_at, which is always after created_at
+    return getattr(model, "updated_at", None) or getattr(model, "created_at", None)
+
+
+# Only single documents get Last-Modified. A list page or batch can change
+# without any timestamp it holds moving forward (a row is deleted, or no
+# longer matches the filter), so those are revalidated by ETag alone.
+
+
+def encode_document(model: BaseModel) -> EncodedBody:
+    """Encode a single document together with its validators"""
+    body = encode_model(model)
+    return EncodedBody(body, make_etag(body), _last_modified(model))
+
+
+def encode_page(models: List[BaseModel], next_cursor: Optional[str] = None) -> EncodedBody:
+    """Encode one page of a list endpoint together with its ETag"""
+    body = encode_models(models)
+    return EncodedBody(body, make_etag(body), next_cursor=next_cursor)
+
+
+def encode_batch(ids: List[str], models: Dict[str, BaseModel]) -> EncodedBody:
+    """Encode a batch lookup in request order, with null for every miss"""
+    body = orjson.dumps([_plain(models[i]) if i in models else None for i in ids])
+    missing = tuple(i for i in ids if i not in models)
+    return EncodedBody(body, make_etag(body), missing_ids=missing)
+
+
+def json_response(body: bytes, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    """Return pre-encoded JSON without FastAPI re-validating it"""
+    return Response(content=body, status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -1,51 +1,348 @@
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from contextlib import asynccontextmanager
+from dataclasses import replace
+import asyncio
+import json
 import logging
 from pathlib import Path
-from models import Character, CharacterCreate, BreathingTechnique, BreathingTechniqueCreate, StoryArc, StoryArcCreate
-from database import init_db, characters_collection, breathing_techniques_collection, story_arcs_collection
-from typing import List
-import uuid
+from urllib.parse import quote
+from models import Character, CharacterCreate, CharacterGraph, BreathingTechnique, BreathingTechniqueCreate, BreathingTechniqueGraph, StoryArc, StoryArcCreate, BulkResult, Job, JobCreate
+import database
+from database import get_collection, CHARACTERS, BREATHING_TECHNIQUES, STORY_ARCS
+from pool_metrics import pool_listener
+from bulk import BulkPayloadError, bulk_insert, iter_items
+from cache import catalog_cache
+import metrics
+from metrics import MetricsMiddleware, loop_lag_monitor, stage_timer
+import profiling
+from profiling import ProfilingMiddleware, profile_as_text, profile_store
+from export import NDJSON_MEDIA_TYPE, iter_ndjson
+from projection import InvalidFields, mongo_projection, parse_fields
+from read_models import row_factory
+from raw_bson import RAW_BSON_READS, decode_rows, encode_raw_batch, encode_raw_page, raw_batch, raw_collection
+from offload import encode_documents, offloader
+from relations import InvalidExpansion, fetch_graph, parse_expand, with_relations
+from indexes import ensure_indexes
+from seed import apply_seed
+from health import ping_check
+from cache_sync import cache_sync, notify_write
+from idempotency import IDEMPOTENCY_COLLECTION, REPLAYED_HEADER, idempotent
+from jobs import InvalidJob, find_job, iter_export, job_queue, job_view, submit_job
+from events import EVENT_STREAM_MEDIA_TYPE, BroadcasterClosed, TooManySubscribers, broadcaster
+from conditional import conditional_response, precondition_failed
+from compression import CompressionMiddleware
+from serialization import EncodedBody, encode_batch, encode_document, encode_model, encode_page, json_response
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ID_SORT, STORY_ARC_SORT, InvalidCursor, fetch_page, sort_signature
+from pymongo.errors import DuplicateKeyError
+from filters import InvalidQuery, build_query, parse_ids, parse_sort
+from typing import List, Optional
 from datetime import datetime
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the shared MongoDB client for the lifetime of the worker"""
+    db = database.connect()
+    await ensure_indexes(db)
+    if await apply_seed(db):
+        for collection in (CHARACTERS, BREATHING_TECHNIQUES, STORY_ARCS):
+            await notify_write(collection)
+    cache_sync.start(db)
+    broadcaster.start()
+    job_queue.start(db)
+    loop_lag_monitor.start()
+    logger.info("✅ Database initialized successfully")
+    try:
+        yield
+    finally:
+        # End open event streams first; they never finish on their own, so
+        # uvicorn needs --timeout-graceful-shutdown to get here while any
+        # are connected
+        broadcaster.close()
+        await job_queue.stop()
+        await loop_lag_monitor.stop()
+        await offloader.shutdown()
+        await cache_sync.stop()
+        await broadcaster.stop()
+        database.close()
+        logger.info("📦 Database connection closed")
 
 # Create the main app without a prefix
-app = FastAPI(title="Demon Slayer API", description="API for Demon Slayer information")
+app = FastAPI(title="Demon Slayer API", description="API for Demon Slayer information", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MISSING_IDS_HEADER = "X-Missing-Ids"
+
+# Bad query parameters are reported to the client as 400s
+CLIENT_ERRORS = (InvalidCursor, InvalidFields, InvalidQuery, InvalidExpansion)
+
+def page_response(request: Request, page: EncodedBody) -> Response:
+    """Serve an encoded page, exposing the cursor for the following page"""
+    headers = {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else None
+    return conditional_response(request, page, headers)
+
+# Cached bodies are validated and encoded once on a miss; hits skip Pydantic
+# entirely and are returned as raw bytes.
+async def cached_page(
+    collection: str,
+    model,
+    sort,
+    limit: int,
+    after: Optional[str],
+    fields: Optional[str] = None,
+    query: Optional[dict] = None,
+) -> EncodedBody:
+    """Read-through cache for one encoded page of a list endpoint"""
+    selected = parse_fields(model, fields)
+    build = row_factory(model, selected)
+    names = selected or list(model.model_fields)
+    async def load():
+        target = get_collection(collection)
+        with stage_timer("query"):
+            documents, next_cursor = await fetch_page(
+                raw_collection(target) if RAW_BSON_READS else target, sort, limit, after,
+                query=query, projection=mongo_projection(model, selected),
+            )
+        if offloader.should_offload(len(documents)):
+            # Large pages are built off the event loop thread
+            with stage_timer("offload"):
+                if RAW_BSON_READS:
+                    return await offloader.run(
+                        encode_raw_batch, raw_batch(documents), names, target.codec_options, next_cursor,
+                    )
+                return await offloader.run(encode_documents, model, selected, documents, next_cursor)
+        if RAW_BSON_READS:
+            with stage_timer("decode"):
+                rows = decode_rows(documents, names, target.codec_options)
+            with stage_timer("serialize"):
+                return encode_raw_page(rows, next_cursor)
+        with stage_timer("validate"):
+            models = [build(document) for document in documents]
+        with stage_timer("serialize"):
+            return encode_page(models, next_cursor)
+    key = (
+        "page", limit, after, tuple(selected) if selected else None,
+        sort_signature(sort), json.dumps(query, sort_keys=True) if query else None,
+    )
+    return await catalog_cache.get_or_load(collection, key, load)
+
+async def cached_document(collection: str, model, document_id: str, fields: Optional[str] = None) -> Optional[EncodedBody]:
+    """Read-through cache for a single encoded document looked up by ID"""
+    selected = parse_fields(model, fields)
+    build = row_factory(model, selected)
+    async def load():
+        with stage_timer("query"):
+            document = await get_collection(collection).find_one({"id": document_id}, mongo_projection(model, selected))
+        if not document:
+            return None
+        with stage_timer("validate"):
+            validated = build(document)
+        with stage_timer("serialize"):
+            return encode_document(validated)
+    key = ("id", document_id, tuple(selected) if selected else None)
+    return await catalog_cache.get_or_load(collection, key, load)
+
+async def cached_batch(collection: str, model, ids: str, fields: Optional[str] = None) -> EncodedBody:
+    """Read-through cache for an ?ids= lookup answered by a single $in query"""
+    requested = parse_ids(ids)
+    selected = parse_fields(model, fields)
+    build = row_factory(model, selected)
+    async def load():
+        with stage_timer("query"):
+            cursor = get_collection(collection).find({"id": {"$in": requested}}, mongo_projection(model, selected))
+            documents = await cursor.to_list(len(requested))
+        with stage_timer("validate"):
+            models = {document["id"]: build(document) for document in documents}
+        with stage_timer("serialize"):
+            return encode_batch(requested, models)
+    key = ("ids", tuple(requested), tuple(selected) if selected else None)
+    return await catalog_cache.get_or_load(collection, key, load)
+
+def batch_response(request: Request, batch: EncodedBody) -> Response:
+    """Serve a batch lookup, listing the ids that were not found"""
+    # Ids come from the client, so they are percent-encoded to keep the
+    # header ASCII and free of anything that could end it early
+    missing = ",".join(quote(document_id, safe="") for document_id in batch.missing_ids)
+    headers = {MISSING_IDS_HEADER: missing} if missing else None
+    return conditional_response(request, batch, headers)
+
+def reject_with_ids(**params):
+    """ids= is a lookup, not a query; refuse to mix it with paging or filters"""
+    given = [name for name, value in params.items() if value is not None]
+    if given:
+        raise InvalidQuery(f"ids cannot be combined with {', '.join(given)}")
+
+async def cached_graph(collection: str, graph_model, document_id: str) -> Optional[EncodedBody]:
+    """Read-through cache for a document joined with its related documents"""
+    async def load():
+        with stage_timer("query"):
+            document = await fetch_graph(database.get_db(), collection, document_id)
+        if not document:
+            return None
+        with stage_timer("validate"):
+            validated = graph_model(**document)
+        with stage_timer("serialize"):
+            # Related documents change without moving the root's timestamps,
+            # so graphs are revalidated by ETag only
+            return replace(encode_document(validated), last_modified=None)
+    return await catalog_cache.get_or_load("relations", (collection, document_id), load)
+
+async def bulk_create(request: Request, collection: str, create_model, model) -> BulkResult:
+    """Shared body of the POST /{collection}/bulk endpoints"""
+    result = BulkResult()
+    try:
+        await bulk_insert(
+            get_collection(collection), create_model, model, iter_items(request),
+            prepare=lambda document: with_relations(collection, document), results=result,
+        )
+    except BulkPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error bulk creating {collection}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error bulk creating {collection}")
+    finally:
+        # Chunks written before a failure are already visible; a request
+        # that wrote nothing must not make every client reload
+        created = [item.id for item in result.results if item.status == "created"]
+        if created:
+            await notify_write(collection, created)
+    return result
+
+async def create_document(request: Request, collection: str, document, label: str) -> Response:
+    """Shared body of the POST create endpoints; honours Idempotency-Key"""
+    async def create():
+        try:
+            await get_collection(collection).insert_one(with_relations(collection, document.dict()))
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail=f"A {label} with ID {document.id} already exists")
+        except Exception as e:
+            logging.error(f"Error creating {label}: {e}")
+            raise HTTPException(status_code=500, detail=f"Error creating {label}")
+        await notify_write(collection, [document.id])
+        return json_response(encode_model(document))
+    return await idempotent(request, get_collection(IDEMPOTENCY_COLLECTION), create)
+
+def bson_now() -> datetime:
+    """utcnow() cut to the millisecond precision BSON dates keep"""
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+async def put_document(request: Request, collection: str, model, document_id: str, data, label: str) -> Response:
+    """Shared body of the PUT endpoints: create or replace the document with this ID.
+
+    If-Match makes the write conditional on the current ETag and
+    If-None-Match: * only lets it create; either failing returns 412.
+    Bodies are built from the stored document the way GET builds them, so
+    the ETags agree.
+    """
+    target = get_collection(collection)
+    build = row_factory(model)
+    try:
+        current = await target.find_one({"id": document_id}, mongo_projection(model, None))
+        if precondition_failed(request, encode_document(build(current)) if current else None):
+            raise HTTPException(status_code=412, detail="Precondition failed")
+        if current:
+            fields = {**with_relations(collection, data.dict()), "updated_at": bson_now()}
+            # With If-Match, only replace the version that was checked: every
+            # replace moves updated_at, so it identifies the version
+            match = {"id": document_id}
+            if request.headers.get("if-match"):
+                match["updated_at"] = current.get("updated_at")
+            result = await target.update_one(match, {"$set": fields})
+            if result.matched_count == 0:
+                raise HTTPException(status_code=412, detail=f"{label.capitalize()} was modified concurrently")
+            stored = {**current, **fields}
+        else:
+            stored = with_relations(collection, model(id=document_id, created_at=bson_now(), **data.dict()).dict())
+            await target.insert_one(stored)
+    except DuplicateKeyError:
+        # Created by a concurrent request between the read and the insert
+        raise HTTPException(status_code=412, detail=f"{label.capitalize()} was created concurrently")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error writing {label} {document_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error writing {label}")
+    await notify_write(collection, [document_id], "update" if current else "insert")
+    encoded = encode_document(build(stored))
+    headers = {"ETag": encoded.etag}
+    if not current:
+        headers["Location"] = request.url.path
+    return json_response(encoded.body, headers, status_code=200 if current else 201)
+
+def export_response(collection: str, model, sort, fields: Optional[str]) -> StreamingResponse:
+    """Shared body of the GET /{collection}/export endpoints"""
+    try:
+        projection = mongo_projection(model, parse_fields(model, fields))
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        iter_ndjson(get_collection(collection), projection, sort),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
+
 # Characters endpoints
 @api_router.get("/characters", response_model=List[Character])
-async def get_characters():
-    """Get all characters"""
+async def get_characters(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    rank: Optional[str] = None,
+    breathing: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    ids: Optional[str] = None,
+):
+    """Get a page of characters, optionally filtered, searched and sorted, or a batch by ids"""
     try:
-        characters = await characters_collection.find().to_list(1000)
-        return [Character(**character) for character in characters]
+        if ids is not None:
+            reject_with_ids(after=after, rank=rank, breathing=breathing, q=q, sort=sort)
+            return batch_response(request, await cached_batch(CHARACTERS, Character, ids, fields))
+        query = build_query(q, rank=rank, breathing=breathing)
+        sort_spec = parse_sort(CHARACTERS, sort, ID_SORT)
+        page = await cached_page(CHARACTERS, Character, sort_spec, limit, after, fields, query)
+        return page_response(request, page)
+    except CLIENT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error getting characters: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving characters")
 
+@api_router.get("/characters/export")
+async def export_characters(fields: Optional[str] = None):
+    """Stream every character as newline-delimited JSON"""
+    return export_response(CHARACTERS, Character, ID_SORT, fields)
+
 @api_router.get("/characters/{character_id}", response_model=Character)
-async def get_character(character_id: str):
+async def get_character(character_id: str, request: Request, fields: Optional[str] = None, expand: Optional[str] = None):
     """Get a specific character by ID"""
     try:
-        character = await characters_collection.find_one({"id": character_id})
+        if parse_expand(CHARACTERS, expand, fields):
+            character = await cached_graph(CHARACTERS, CharacterGraph, character_id)
+        else:
+            character = await cached_document(CHARACTERS, Character, character_id, fields)
         if character:
-            return Character(**character)
+            return conditional_response(request, character)
         raise HTTPException(status_code=404, detail="Character not found")
+    except CLIENT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -53,36 +350,69 @@ async def get_character(character_id: str):
         raise HTTPException(status_code=500, detail="Error retrieving character")
 
 @api_router.post("/characters", response_model=Character)
-async def create_character(character_data: CharacterCreate):
+async def create_character(character_data: CharacterCreate, request: Request):
     """Create a new character"""
-    try:
-        character_dict = character_data.dict()
-        character_obj = Character(**character_dict)
-        await characters_collection.insert_one(character_obj.dict())
-        return character_obj
-    except Exception as e:
-        logging.error(f"Error creating character: {e}")
-        raise HTTPException(status_code=500, detail="Error creating character")
+    character_dict = character_data.dict()
+    character_obj = Character(**character_dict)
+    return await create_document(request, CHARACTERS, character_obj, "character")
+
+@api_router.put("/characters/{character_id}", response_model=Character)
+async def put_character(character_id: str, character_data: CharacterCreate, request: Request):
+    """Create or replace the character with this ID"""
+    return await put_document(request, CHARACTERS, Character, character_id, character_data, "character")
+
+@api_router.post("/characters/bulk", response_model=BulkResult)
+async def bulk_create_characters(request: Request):
+    """Create many characters from a JSON array or an NDJSON stream"""
+    return await bulk_create(request, CHARACTERS, CharacterCreate, Character)
 
 # Breathing Techniques endpoints
 @api_router.get("/breathing-techniques", response_model=List[BreathingTechnique])
-async def get_breathing_techniques():
-    """Get all breathing techniques"""
+async def get_breathing_techniques(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    element: Optional[str] = None,
+    users: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    ids: Optional[str] = None,
+):
+    """Get a page of breathing techniques, optionally filtered, searched and sorted, or a batch by ids"""
     try:
-        techniques = await breathing_techniques_collection.find().to_list(1000)
-        return [BreathingTechnique(**technique) for technique in techniques]
+        if ids is not None:
+            reject_with_ids(after=after, element=element, users=users, q=q, sort=sort)
+            return batch_response(request, await cached_batch(BREATHING_TECHNIQUES, BreathingTechnique, ids, fields))
+        # users matches techniques whose users array contains the given name
+        query = build_query(q, element=element, users=users)
+        sort_spec = parse_sort(BREATHING_TECHNIQUES, sort, ID_SORT)
+        page = await cached_page(BREATHING_TECHNIQUES, BreathingTechnique, sort_spec, limit, after, fields, query)
+        return page_response(request, page)
+    except CLIENT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error getting breathing techniques: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving breathing techniques")
 
+@api_router.get("/breathing-techniques/export")
+async def export_breathing_techniques(fields: Optional[str] = None):
+    """Stream every breathing technique as newline-delimited JSON"""
+    return export_response(BREATHING_TECHNIQUES, BreathingTechnique, ID_SORT, fields)
+
 @api_router.get("/breathing-techniques/{technique_id}", response_model=BreathingTechnique)
-async def get_breathing_technique(technique_id: str):
+async def get_breathing_technique(technique_id: str, request: Request, fields: Optional[str] = None, expand: Optional[str] = None):
     """Get a specific breathing technique by ID"""
     try:
-        technique = await breathing_techniques_collection.find_one({"id": technique_id})
+        if parse_expand(BREATHING_TECHNIQUES, expand, fields):
+            technique = await cached_graph(BREATHING_TECHNIQUES, BreathingTechniqueGraph, technique_id)
+        else:
+            technique = await cached_document(BREATHING_TECHNIQUES, BreathingTechnique, technique_id, fields)
         if technique:
-            return BreathingTechnique(**technique)
+            return conditional_response(request, technique)
         raise HTTPException(status_code=404, detail="Breathing technique not found")
+    except CLIENT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -90,36 +420,67 @@ async def get_breathing_technique(technique_id: str):
         raise HTTPException(status_code=500, detail="Error retrieving breathing technique")
 
 @api_router.post("/breathing-techniques", response_model=BreathingTechnique)
-async def create_breathing_technique(technique_data: BreathingTechniqueCreate):
+async def create_breathing_technique(technique_data: BreathingTechniqueCreate, request: Request):
     """Create a new breathing technique"""
-    try:
-        technique_dict = technique_data.dict()
-        technique_obj = BreathingTechnique(**technique_dict)
-        await breathing_techniques_collection.insert_one(technique_obj.dict())
-        return technique_obj
-    except Exception as e:
-        logging.error(f"Error creating breathing technique: {e}")
-        raise HTTPException(status_code=500, detail="Error creating breathing technique")
+    technique_dict = technique_data.dict()
+    technique_obj = BreathingTechnique(**technique_dict)
+    return await create_document(request, BREATHING_TECHNIQUES, technique_obj, "breathing technique")
+
+@api_router.put("/breathing-techniques/{technique_id}", response_model=BreathingTechnique)
+async def put_breathing_technique(technique_id: str, technique_data: BreathingTechniqueCreate, request: Request):
+    """Create or replace the breathing technique with this ID"""
+    return await put_document(
+        request, BREATHING_TECHNIQUES, BreathingTechnique, technique_id, technique_data, "breathing technique",
+    )
+
+@api_router.post("/breathing-techniques/bulk", response_model=BulkResult)
+async def bulk_create_breathing_techniques(request: Request):
+    """Create many breathing techniques from a JSON array or an NDJSON stream"""
+    return await bulk_create(request, BREATHING_TECHNIQUES, BreathingTechniqueCreate, BreathingTechnique)
 
 # Story Arcs endpoints
 @api_router.get("/story-arcs", response_model=List[StoryArc])
-async def get_story_arcs():
-    """Get all story arcs ordered by sequence"""
+async def get_story_arcs(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    min_order: Optional[int] = None,
+    max_order: Optional[int] = None,
+    q: Optional[str] = None,
+    sort: Optional[str] = None,
+    ids: Optional[str] = None,
+):
+    """Get a page of story arcs, ordered by sequence unless sorted otherwise, or a batch by ids"""
     try:
-        arcs = await story_arcs_collection.find().sort("order", 1).to_list(1000)
-        return [StoryArc(**arc) for arc in arcs]
+        if ids is not None:
+            reject_with_ids(after=after, min_order=min_order, max_order=max_order, q=q, sort=sort)
+            return batch_response(request, await cached_batch(STORY_ARCS, StoryArc, ids, fields))
+        query = build_query(q, order={"$gte": min_order, "$lte": max_order})
+        sort_spec = parse_sort(STORY_ARCS, sort, STORY_ARC_SORT)
+        page = await cached_page(STORY_ARCS, StoryArc, sort_spec, limit, after, fields, query)
+        return page_response(request, page)
+    except CLIENT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error getting story arcs: {e}")
         raise HTTPException(status_code=500, detail="Error retrieving story arcs")
 
+@api_router.get("/story-arcs/export")
+async def export_story_arcs(fields: Optional[str] = None):
+    """Stream every story arc as newline-delimited JSON"""
+    return export_response(STORY_ARCS, StoryArc, STORY_ARC_SORT, fields)
+
 @api_router.get("/story-arcs/{arc_id}", response_model=StoryArc)
-async def get_story_arc(arc_id: str):
+async def get_story_arc(arc_id: str, request: Request, fields: Optional[str] = None):
     """Get a specific story arc by ID"""
     try:
-        arc = await story_arcs_collection.find_one({"id": arc_id})
+        arc = await cached_document(STORY_ARCS, StoryArc, arc_id, fields)
         if arc:
-            return StoryArc(**arc)
+            return conditional_response(request, arc)
         raise HTTPException(status_code=404, detail="Story arc not found")
+    except CLIENT_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -127,65 +488,175 @@ async def get_story_arc(arc_id: str):
         raise HTTPException(status_code=500, detail="Error retrieving story arc")
 
 @api_router.post("/story-arcs", response_model=StoryArc)
-async def create_story_arc(arc_data: StoryArcCreate):
+async def create_story_arc(arc_data: StoryArcCreate, request: Request):
     """Create a new story arc"""
-    try:
-        arc_dict = arc_data.dict()
-        arc_obj = StoryArc(**arc_dict)
-        await story_arcs_collection.insert_one(arc_obj.dict())
-        return arc_obj
-    except Exception as e:
-        logging.error(f"Error creating story arc: {e}")
-        raise HTTPException(status_code=500, detail="Error creating story arc")
+    arc_dict = arc_data.dict()
+    arc_obj = StoryArc(**arc_dict)
+    return await create_document(request, STORY_ARCS, arc_obj, "story arc")
+
+@api_router.put("/story-arcs/{arc_id}", response_model=StoryArc)
+async def put_story_arc(arc_id: str, arc_data: StoryArcCreate, request: Request):
+    """Create or replace the story arc with this ID"""
+    return await put_document(request, STORY_ARCS, StoryArc, arc_id, arc_data, "story arc")
+
+@api_router.post("/story-arcs/bulk", response_model=BulkResult)
+async def bulk_create_story_arcs(request: Request):
+    """Create many story arcs from a JSON array or an NDJSON stream"""
+    return await bulk_create(request, STORY_ARCS, StoryArcCreate, StoryArc)
 
 # Health check endpoint
 @api_router.get("/")
 async def root():
     return {"message": "Demon Slayer API is running!", "status": "healthy"}
 
+@api_router.get("/events")
+async def catalog_events(request: Request):
+    """Server-Sent Events feed of catalog inserts and updates"""
+    try:
+        stream = broadcaster.subscribe(request.headers.get("last-event-id"))
+    except (TooManySubscribers, BroadcasterClosed) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        stream,
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        # Keep proxies from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Background jobs
+@api_router.post("/jobs", response_model=Job, status_code=202)
+async def create_job(request: Request, job: JobCreate):
+    """Queue a background import, export, reindex or seed; honours Idempotency-Key"""
+    async def submit():
+        try:
+            document = await submit_job(database.get_db(), job.kind, job.params)
+        except InvalidJob as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logging.error(f"Error queueing {job.kind} job: {e}")
+            raise HTTPException(status_code=500, detail="Error queueing job")
+        return json_response(
+            encode_model(job_view(document)), headers={"Location": f"/api/jobs/{document['_id']}"}, status_code=202,
+        )
+    return await idempotent(request, get_collection(IDEMPOTENCY_COLLECTION), submit)
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Status and progress of a background job"""
+    job = await find_job(database.get_db(), job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+@api_router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Download the NDJSON built by a finished export job"""
+    job = await find_job(database.get_db(), job_id)
+    if not job or job["kind"] != "export":
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+    return StreamingResponse(iter_export(database.get_db(), job_id), media_type=NDJSON_MEDIA_TYPE)
+
+@api_router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the catalog cache and how it is kept in sync"""
+    return {**catalog_cache.stats(), "sync": cache_sync.status()}
+
+@api_router.get("/metrics/pool")
+async def pool_metrics():
+    """Connection pool checkout wait times and occupancy"""
+    return pool_listener.snapshot()
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, MongoDB, cache and pool metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+def require_profile_token(request: Request):
+    """Profiles record request paths and query strings, so they share the profiling token"""
+    if profiling.PROFILE_TOKEN and not profiling.token_matches(request.headers.get(profiling.PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="A valid X-Profile token is required")
+
+@api_router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """Request profiles held in the on-disk ring buffer, newest first"""
+    return {"enabled": profiling.PROFILING_ENABLED, "profiles": await asyncio.to_thread(profile_store.list)}
+
+@api_router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str, format: Optional[str] = None):
+    """Download a stored profile, or format=text for a cProfile summary"""
+    profile = await asyncio.to_thread(profile_store.find, profile_id)
+    if not profile or not profile["path"].exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        if profile["format"] != "prof":
+            raise HTTPException(status_code=400, detail="Text summaries are only available for cProfile profiles")
+        return PlainTextResponse(await asyncio.to_thread(profile_as_text, profile["path"]))
+    media_type = "text/html" if profile["format"] == "html" else "application/octet-stream"
+    return FileResponse(profile["path"], media_type=media_type, filename=profile["file"])
+
+@api_router.get("/livez")
+async def liveness():
+    """Liveness probe: the worker is up and serving; never touches MongoDB"""
+    return {"status": "alive"}
+
+@api_router.get("/readyz")
+async def readiness():
+    """Readiness probe backed by a cached MongoDB ping, with pool and cache state"""
+    if database.db is None:
+        return JSONResponse(status_code=503, content={"status": "not ready", "database": {"ok": False, "error": "not connected"}})
+    ping = await ping_check.check(database.db)
+    pool = pool_listener.snapshot()
+    cache = catalog_cache.stats()
+    return JSONResponse(
+        status_code=200 if ping["ok"] else 503,
+        content={
+            "status": "ready" if ping["ok"] else "not ready",
+            "database": ping,
+            "pool": {key: pool[key] for key in ("in_use", "open_connections", "checkout_failures")},
+            "cache": {"backend": cache["backend"], "entries": cache.get("entries", 0)},
+        },
+    )
+
 @api_router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        # Test database connection
-        await characters_collection.count_documents({})
+    if database.db is None:
+        return JSONResponse(status_code=503, content={"status": "unhealthy", "database": "disconnected", "error": "not connected"})
+    # Shares the readiness ping cache instead of querying collection data
+    ping = await ping_check.check(database.db)
+    if ping["ok"]:
         return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        logging.error(f"Health check failed: {e}")
-        return JSONResponse(
-            status_code=503,
-            content={"status": "unhealthy", "database": "disconnected", "error": str(e)}
-        )
+    logging.error(f"Health check failed: {ping['error']}")
+    return JSONResponse(
+        status_code=503,
+        content={"status": "unhealthy", "database": "disconnected", "error": ping["error"]}
+    )
 
 # Include the router in the main app
 app.include_router(api_router)
 
+metrics.register_cache_metrics(catalog_cache)
+metrics.register_pool_metrics(pool_listener)
+# Added first so it sits innermost and profiles only the request handling
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, MISSING_IDS_HEADER, "ETag", "Last-Modified", "Location", REPLAYED_HEADER, profiling.PROFILE_ID_HEADER],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-@app.on_event("startup")
-async def startup_db():
-    """Initialize database on startup"""
-    await init_db()
-    logger.info("✅ Database initialized successfully")
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
-    logger.info("📦 Database connection closed")
-
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Open event streams would otherwise keep uvicorn from ever reaching
+    # the lifespan shutdown that ends them
+    uvicorn.run(app, host="0.0.0.0", port=8001, timeout_graceful_shutdown=5)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { breathingTechniquesAPI } from '../services/api';
+import { breathingTechniquesAPI, subscribeToCollection } from '../services/api';
 
 const BreathingTechniques = () => {
   const [breathingTechniques, setBreathingTechniques] = useState([]);
@@ -26,6 +26,9 @@ const BreathingTechniques = () => {
     fetchBreathingTechniques();
   }, []);
 
+  // Patch the list in place as the catalog changes instead of reloading it
+  useEffect(() => subscribeToCollection('breathing_techniques', breathingTechniquesAPI, setBreathingTechniques), []);
+
   useEffect(() => {
     const observer = new IntersectionObserver(
       (entries) => {
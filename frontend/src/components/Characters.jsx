@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { charactersAPI } from '../services/api';
+import { charactersAPI, subscribeToCollection } from '../services/api';
 
 const Characters = () => {
   const [characters, setCharacters] = useState([]);
@@ -26,6 +26,9 @@ const Characters = () => {
     fetchCharacters();
   }, []);
 
+  // Patch the list in place as the catalog changes instead of reloading it
+  useEffect(() => subscribeToCollection('characters', charactersAPI, setCharacters), []);
+
   useEffect(() => {
     const observer = new IntersectionObserver(
       (entries) => {
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { storyArcsAPI } from '../services/api';
+import { storyArcsAPI, subscribeToCollection } from '../services/api';
 
 const StoryArcs = () => {
   const [storyArcs, setStoryArcs] = useState([]);
@@ -26,6 +26,9 @@ const StoryArcs = () => {
     fetchStoryArcs();
   }, []);
 
+  // Patch the list in place as the catalog changes instead of reloading it
+  useEffect(() => subscribeToCollection('story_arcs', storyArcsAPI, setStoryArcs, (a, b) => a.order - b.order), []);
+
   useEffect(() => {
     const observer = new IntersectionObserver(
       (entries) => {
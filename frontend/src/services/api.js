@@ -10,6 +10,61 @@ const apiClient = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // 304 Not Modified is answered from the validator cache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Last response seen per GET URL, replayed when the server answers 304.
+// Map keeps insertion order, so the first key is the least recently used.
+const VALIDATOR_CACHE_SIZE = 100;
+const validatorCache = new Map();
+
+const cacheKey = (config) => apiClient.getUri(config);
+
+const rememberResponse = (key, entry) => {
+  validatorCache.delete(key);
+  validatorCache.set(key, entry);
+  while (validatorCache.size > VALIDATOR_CACHE_SIZE) {
+    validatorCache.delete(validatorCache.keys().next().value);
+  }
+};
+
+// Conditional requests: send the stored ETag / Last-Modified on every GET
+apiClient.interceptors.request.use((config) => {
+  if (config.method === 'get') {
+    const cached = validatorCache.get(cacheKey(config));
+    // Kept on the request so a 304 can be answered even if the entry is
+    // evicted while the request is in flight
+    config.validatorEntry = cached;
+    if (cached?.etag) {
+      config.headers['If-None-Match'] = cached.etag;
+    } else if (cached?.lastModified) {
+      config.headers['If-Modified-Since'] = cached.lastModified;
+    }
+  }
+  return config;
+});
+
+apiClient.interceptors.response.use((response) => {
+  if (response.config.method !== 'get') {
+    return response;
+  }
+  const key = cacheKey(response.config);
+  if (response.status === 304) {
+    const cached = response.config.validatorEntry;
+    if (cached) {
+      response.data = cached.data;
+      response.headers = { ...cached.headers, ...response.headers };
+      rememberResponse(key, cached);
+    }
+    return response;
+  }
+  const etag = response.headers['etag'];
+  const lastModified = response.headers['last-modified'];
+  if (etag || lastModified) {
+    rememberResponse(key, { etag, lastModified, data: response.data, headers: response.headers });
+  }
+  return response;
 });
 
 // Request interceptor for logging
@@ -36,12 +91,73 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Page size requested from the paginated list endpoints
+const PAGE_SIZE = 500;
+
+// Follow the X-Next-Cursor header until the server reports no further pages
+const fetchAllPages = async (path, params = {}) => {
+  const items = [];
+  let after;
+  do {
+    const response = await apiClient.get(path, {
+      params: { ...params, limit: PAGE_SIZE, ...(after ? { after } : {}) },
+    });
+    items.push(...response.data);
+    after = response.headers['x-next-cursor'];
+  } while (after);
+  return items;
+};
+
+// Most ids the server accepts in one ?ids= lookup
+const MAX_BATCH_IDS = 100;
+
+// Coalesce getById calls made in the same tick into ?ids= batch requests.
+// Resolves with the document, or null when the server reports a miss.
+const createBatchLoader = (path) => {
+  let pending = null;
+
+  const dispatch = async (batch) => {
+    const ids = [...batch.keys()];
+    for (let start = 0; start < ids.length; start += MAX_BATCH_IDS) {
+      const chunk = ids.slice(start, start + MAX_BATCH_IDS);
+      try {
+        const response = await apiClient.get(path, { params: { ids: chunk.join(',') } });
+        chunk.forEach((id, index) => {
+          batch.get(id).forEach(({ resolve }) => resolve(response.data[index] ?? null));
+        });
+      } catch (error) {
+        chunk.forEach((id) => batch.get(id).forEach(({ reject }) => reject(error)));
+      }
+    }
+  };
+
+  return (id) => new Promise((resolve, reject) => {
+    if (!pending) {
+      pending = new Map();
+      setTimeout(() => {
+        const batch = pending;
+        pending = null;
+        dispatch(batch);
+      }, 0);
+    }
+    const key = String(id);
+    if (!pending.has(key)) {
+      pending.set(key, []);
+    }
+    pending.get(key).push({ resolve, reject });
+  });
+};
+
+const loadCharacter = createBatchLoader('/characters');
+const loadBreathingTechnique = createBatchLoader('/breathing-techniques');
+const loadStoryArc = createBatchLoader('/story-arcs');
+
 // Characters API
 export const charactersAPI = {
-  getAll: async () => {
+  // params: e.g. { fields: 'name,rank,image' } for a sparse fieldset
+  getAll: async (params = {}) => {
     try {
-      const response = await apiClient.get('/characters');
-      return response.data;
+      return await fetchAllPages('/characters', params);
     } catch (error) {
       console.error('Error fetching characters:', error);
       throw new Error('Failed to fetch characters');
@@ -50,8 +166,11 @@ export const charactersAPI = {
 
   getById: async (id) => {
     try {
-      const response = await apiClient.get(`/characters/${id}`);
-      return response.data;
+      const character = await loadCharacter(id);
+      if (!character) {
+        throw new Error(`Character ${id} not found`);
+      }
+      return character;
     } catch (error) {
       console.error(`Error fetching character ${id}:`, error);
       throw new Error('Failed to fetch character');
@@ -71,10 +190,9 @@ export const charactersAPI = {
 
 // Breathing Techniques API
 export const breathingTechniquesAPI = {
-  getAll: async () => {
+  getAll: async (params = {}) => {
     try {
-      const response = await apiClient.get('/breathing-techniques');
-      return response.data;
+      return await fetchAllPages('/breathing-techniques', params);
     } catch (error) {
       console.error('Error fetching breathing techniques:', error);
       throw new Error('Failed to fetch breathing techniques');
@@ -83,8 +201,11 @@ export const breathingTechniquesAPI = {
 
   getById: async (id) => {
     try {
-      const response = await apiClient.get(`/breathing-techniques/${id}`);
-      return response.data;
+      const technique = await loadBreathingTechnique(id);
+      if (!technique) {
+        throw new Error(`Breathing technique ${id} not found`);
+      }
+      return technique;
     } catch (error) {
       console.error(`Error fetching breathing technique ${id}:`, error);
       throw new Error('Failed to fetch breathing technique');
@@ -104,10 +225,9 @@ export const breathingTechniquesAPI = {
 
 // Story Arcs API
 export const storyArcsAPI = {
-  getAll: async () => {
+  getAll: async (params = {}) => {
     try {
-      const response = await apiClient.get('/story-arcs');
-      return response.data;
+      return await fetchAllPages('/story-arcs', params);
     } catch (error) {
       console.error('Error fetching story arcs:', error);
       throw new Error('Failed to fetch story arcs');
@@ -116,8 +236,11 @@ export const storyArcsAPI = {
 
   getById: async (id) => {
     try {
-      const response = await apiClient.get(`/story-arcs/${id}`);
-      return response.data;
+      const arc = await loadStoryArc(id);
+      if (!arc) {
+        throw new Error(`Story arc ${id} not found`);
+      }
+      return arc;
     } catch (error) {
       console.error(`Error fetching story arc ${id}:`, error);
       throw new Error('Failed to fetch story arc');
@@ -135,6 +258,59 @@ export const storyArcsAPI = {
   }
 };
 
+// Server-Sent Events: one shared EventSource fans catalog changes out to
+// every subscribed page
+const CATALOG_EVENTS = ['insert', 'update', 'replace', 'delete', 'refresh'];
+const eventListeners = new Set();
+let eventSource = null;
+
+const openEventSource = () => {
+  eventSource = new EventSource(`${API}/events`);
+  CATALOG_EVENTS.forEach((type) => {
+    eventSource.addEventListener(type, (message) => {
+      const event = JSON.parse(message.data);
+      eventListeners.forEach((listener) => listener(event));
+    });
+  });
+};
+
+// Returns an unsubscribe function; the stream closes with the last listener
+export const subscribeToEvents = (listener) => {
+  eventListeners.add(listener);
+  if (!eventSource) {
+    openEventSource();
+  }
+  return () => {
+    eventListeners.delete(listener);
+    if (eventListeners.size === 0 && eventSource) {
+      eventSource.close();
+      eventSource = null;
+    }
+  };
+};
+
+const byId = (a, b) => String(a.id).localeCompare(String(b.id));
+
+// Keep a list held in React state current: changed documents are fetched
+// one by one and patched in, and the whole list is reloaded only when the
+// server sends a refresh (or a change without an id)
+export const subscribeToCollection = (collection, api, setItems, compare = byId) =>
+  subscribeToEvents(async (event) => {
+    if (event.collection && event.collection !== collection) {
+      return;
+    }
+    try {
+      if (event.type === 'refresh' || event.type === 'delete' || !event.id) {
+        setItems(await api.getAll());
+        return;
+      }
+      const item = await api.getById(event.id);
+      setItems((items) => [...items.filter((existing) => existing.id !== item.id), item].sort(compare));
+    } catch (error) {
+      console.error(`Error applying ${collection} update:`, error);
+    }
+  });
+
 // Health check API
 export const healthAPI = {
   check: async () => {
@@ -0,0 +1,31 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+@pytest.fixture
+def run_app(monkeypatch):
+    """Run scenario(client) against the app, backed by an in-memory mongomock database"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import httpx
+
+    import database
+    import server
+
+    monkeypatch.setenv("MONGO_URL", "mongodb://localhost:27017")
+    monkeypatch.setenv("DB_NAME", "demon_slayer_test")
+
+    def run(scenario):
+        async def main():
+            database.connect(client_factory=mongomock_motor.AsyncMongoMockClient)
+            async with server.app.router.lifespan_context(server.app):
+                transport = httpx.ASGITransport(app=server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+        return asyncio.run(main())
+    return run
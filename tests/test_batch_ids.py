@@ -0,0 +1,17 @@
+"""?ids= batch lookups, run against the seeded fixtures on mongomock"""
+
+
+def test_ids_returns_documents_in_request_order_with_nulls_for_misses(run_app):
+    async def scenario(client):
+        return await client.get("/api/characters", params={"ids": "3,missing one,1,3", "fields": "name"})
+
+    response = run_app(scenario)
+    assert response.json() == [{"id": "3", "name": "Zenitsu Agatsuma"}, None, {"id": "1", "name": "Tanjiro Kamado"}]
+    assert response.headers["X-Missing-Ids"] == "missing%20one"
+
+
+def test_ids_cannot_be_combined_with_paging(run_app):
+    async def scenario(client):
+        return await client.get("/api/characters", params={"ids": "1", "after": "x"})
+
+    assert run_app(scenario).status_code == 400
@@ -0,0 +1,45 @@
+"""Bulk creates with per-item results, run against mongomock through the ASGI app"""
+import orjson
+
+import database
+
+CHARACTER = {
+    "name": "Murata",
+    "description": "d",
+    "breathing": "Water Breathing",
+    "rank": "Mizunoto",
+    "image": "i",
+    "abilities": [],
+    "personality": "p",
+}
+
+
+def test_bulk_json_reports_each_item(run_app):
+    async def scenario(client):
+        items = [CHARACTER, {"name": "No rank"}, {**CHARACTER, "name": "Ozaki"}]
+        response = await client.post("/api/characters/bulk", json=items)
+        stored = await database.get_collection("characters").count_documents({"name": {"$in": ["Murata", "Ozaki"]}})
+        return response.json(), stored
+
+    result, stored = run_app(scenario)
+    assert (result["inserted"], result["failed"], stored) == (2, 1, 2)
+    assert [item["status"] for item in result["results"]] == ["created", "error", "created"]
+    assert "description" in result["results"][1]["error"]
+
+
+def test_bulk_ndjson_reports_unparseable_lines(run_app):
+    async def scenario(client):
+        body = orjson.dumps(CHARACTER) + b"\n{not json\n\n" + orjson.dumps({**CHARACTER, "name": "Ozaki"})
+        response = await client.post("/api/characters/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        return response.json()
+
+    result = run_app(scenario)
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert result["results"][1]["error"].startswith("Invalid JSON")
+
+
+def test_bulk_rejects_a_body_that_is_not_an_array(run_app):
+    async def scenario(client):
+        return await client.post("/api/characters/bulk", json=CHARACTER)
+
+    assert run_app(scenario).status_code == 400
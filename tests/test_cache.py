@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import MemoryCache
+
+
+class Clock:
+    """Stands in for the time module so TTLs can expire without sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def loader_for(value):
+    async def load():
+        return value
+    return load
+
+
+def test_least_recently_used_entry_is_evicted():
+    memory = MemoryCache(max_entries=2)
+    memory.set("characters", "a", 1)
+    memory.set("characters", "b", 2)
+    assert memory.get("characters", "a") == 1
+    memory.set("characters", "c", 3)
+
+    assert memory.get("characters", "b") is cache._MISSING
+    assert memory.get("characters", "a") == 1
+    assert memory.get("characters", "c") == 3
+    assert memory.stats()["namespaces"]["characters"]["evictions"] == 1
+
+
+def test_entries_expire_after_their_namespace_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    memory = MemoryCache(default_ttl=60, ttls={"story_arcs": 5})
+    memory.set("characters", "a", 1)
+    memory.set("story_arcs", "a", 2)
+
+    clock.now += 10
+    assert memory.get("characters", "a") == 1
+    assert memory.get("story_arcs", "a") is cache._MISSING
+
+    clock.now += 60
+    assert memory.get("characters", "a") is cache._MISSING
+    assert memory.stats()["namespaces"]["characters"]["expirations"] == 1
+
+
+def test_load_started_before_invalidate_is_not_stored():
+    memory = MemoryCache()
+
+    async def scenario():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def stale_load():
+            started.set()
+            await release.wait()
+            return "stale"
+
+        pending = asyncio.ensure_future(memory.get_or_load("characters", "a", stale_load))
+        await started.wait()
+        memory.invalidate_collection("characters")
+        release.set()
+        assert await pending == "stale"
+        return await memory.get_or_load("characters", "a", loader_for("fresh"))
+
+    assert asyncio.run(scenario()) == "fresh"
+
+
+def test_requests_after_invalidate_do_not_join_an_earlier_load():
+    memory = MemoryCache()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def stale_load():
+            await release.wait()
+            return "stale"
+
+        pending = asyncio.ensure_future(memory.get_or_load("characters", "a", stale_load))
+        await asyncio.sleep(0)
+        memory.invalidate("characters")
+        fresh = await memory.get_or_load("characters", "a", loader_for("fresh"))
+        release.set()
+        await pending
+        return fresh
+
+    assert asyncio.run(scenario()) == "fresh"
+
+
+def test_concurrent_misses_share_one_load():
+    memory = MemoryCache()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(memory.get_or_load("characters", "a", load) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_missing_documents_are_not_cached():
+    memory = MemoryCache()
+
+    async def scenario():
+        first = await memory.get_or_load("characters", "nope", loader_for(None))
+        return first, await memory.get_or_load("characters", "nope", loader_for("created"))
+
+    assert asyncio.run(scenario()) == (None, "created")
+    assert memory.stats()["entries"] == 1
+
+
+def test_backends_missing_a_method_cannot_be_created():
+    class Incomplete(cache.Cache):
+        def get(self, namespace, key):
+            return cache._MISSING
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import cache_sync
+from cache import MemoryCache
+from cache_sync import CacheSync
+
+
+class Stream:
+    """A change stream that opens and then waits for changes that never come"""
+
+    resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.Event().wait()
+
+
+class Database:
+    """mongomock database whose watch() fails with the given errors before it opens"""
+
+    def __init__(self, *errors):
+        self._db = mongomock_motor.AsyncMongoMockClient()["demon_slayer_test"]
+        self._errors = list(errors)
+        self.attempts = 0
+
+    def __getitem__(self, name):
+        return self._db[name]
+
+    def watch(self, *args, **kwargs):
+        self.attempts += 1
+        if self._errors:
+            raise self._errors.pop(0)
+        return Stream()
+
+
+def settle(db, mode="auto"):
+    async def scenario():
+        sync = CacheSync(MemoryCache(), mode=mode, poll_interval=0.01)
+        sync.start(db)
+        await asyncio.sleep(0.1)
+        active = sync.active_mode
+        await sync.stop()
+        return active
+    return asyncio.run(scenario())
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(cache_sync, "MIN_RETRY_SECONDS", 0.01)
+
+
+def test_transient_errors_are_retried_until_the_stream_opens():
+    db = Database(AutoReconnect("connection refused"), OperationFailure("not primary", code=10107))
+    assert settle(db) == "changestream"
+    assert db.attempts == 3
+
+
+def test_standalone_server_falls_back_to_polling():
+    db = Database(OperationFailure("The $changeStream stage is only supported on replica sets", code=40573))
+    assert settle(db) == "poll"
+    assert db.attempts == 1
+
+
+def test_changestream_mode_never_polls():
+    db = Database(OperationFailure("The $changeStream stage is only supported on replica sets", code=40573))
+    assert settle(db, mode="changestream") is None
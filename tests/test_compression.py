@@ -0,0 +1,26 @@
+"""Negotiated compression of catalog responses, run against the seeded fixtures on mongomock"""
+
+
+def test_large_bodies_are_compressed_when_the_client_accepts_it(run_app):
+    async def scenario(client):
+        plain = await client.get("/api/characters", headers={"Accept-Encoding": "identity"})
+        gzipped = await client.get("/api/characters", headers={"Accept-Encoding": "gzip"})
+        return plain, gzipped
+
+    plain, gzipped = run_app(scenario)
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in gzipped.headers["Vary"]
+    # httpx decodes the body; the compressed bytes get their own strong ETag
+    assert gzipped.content == plain.content
+    assert gzipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+
+def test_compressed_etags_revalidate_with_304(run_app):
+    async def scenario(client):
+        headers = {"Accept-Encoding": "gzip"}
+        first = await client.get("/api/characters", headers=headers)
+        again = await client.get("/api/characters", headers={**headers, "If-None-Match": first.headers["ETag"]})
+        return again
+
+    assert run_app(scenario).status_code == 304
@@ -0,0 +1,34 @@
+"""Conditional GETs answered with 304, run against the seeded fixtures on mongomock"""
+
+
+def test_unchanged_resources_revalidate_with_304(run_app):
+    async def scenario(client):
+        first = await client.get("/api/characters/1")
+        by_etag = await client.get("/api/characters/1", headers={"If-None-Match": first.headers["ETag"]})
+        by_date = await client.get("/api/characters/1", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        other = await client.get("/api/characters/1", headers={"If-None-Match": '"something-else"'})
+        return first, by_etag, by_date, other
+
+    first, by_etag, by_date, other = run_app(scenario)
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert (by_etag.status_code, by_etag.content) == (304, b"")
+    assert by_etag.headers["ETag"] == first.headers["ETag"]
+    assert by_date.status_code == 304
+    assert other.status_code == 200
+
+
+def test_lists_and_graphs_revalidate_by_etag_only(run_app):
+    async def scenario(client):
+        page = await client.get("/api/story-arcs", params={"min_order": 5})
+        graph = await client.get("/api/characters/1", params={"expand": "techniques"})
+        # Arc 6 leaves the filtered page; no timestamp left on it moves
+        await client.put("/api/story-arcs/6", json={
+            "title": "Moved", "description": "d", "episodes": "1", "key_events": [], "image": "i", "order": 0,
+        })
+        since = {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+        return page, graph, await client.get("/api/story-arcs", params={"min_order": 5}, headers=since)
+
+    page, graph, revalidated = run_app(scenario)
+    assert "Last-Modified" not in page.headers
+    assert "Last-Modified" not in graph.headers
+    assert revalidated.status_code == 200
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from events import REFRESH, Broadcaster, BroadcasterClosed
+
+
+async def collect(stream):
+    return [message async for message in stream]
+
+
+def test_close_ends_open_streams_and_refuses_new_ones():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.start()
+        reader = asyncio.ensure_future(collect(broadcaster.subscribe()))
+        await asyncio.sleep(0)
+        broadcaster.publish({"type": "insert", "collection": "characters", "id": "1"})
+        await asyncio.sleep(0)
+        broadcaster.close()
+        messages = await asyncio.wait_for(reader, 1)
+        with pytest.raises(BroadcasterClosed):
+            broadcaster.subscribe()
+        await broadcaster.stop()
+        return messages
+
+    retry, event = asyncio.run(scenario())
+    assert retry.startswith(b"retry:")
+    assert b"event: insert" in event
+
+
+def test_close_ends_a_stream_whose_queue_is_full():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=1)
+        stream = broadcaster.subscribe()
+        for n in range(3):
+            broadcaster.publish({"type": "insert", "collection": "characters", "id": str(n)})
+        broadcaster.close()
+        return await asyncio.wait_for(collect(stream), 1)
+
+    assert len(asyncio.run(scenario())) == 1
+
+
+def test_reconnect_replays_missed_events():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.publish({"type": "insert", "collection": "characters", "id": "1"})
+        broadcaster.publish({"type": "insert", "collection": "characters", "id": "2"})
+        stream = broadcaster.subscribe(f"{broadcaster.epoch}-1")
+        broadcaster.close()
+        return await collect(stream)
+
+    messages = asyncio.run(scenario())
+    assert len(messages) == 2
+    assert b'"id":"2"' in messages[1]
+
+
+def test_unknown_last_event_id_gets_a_refresh():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.publish({"type": "insert", "collection": "characters", "id": "1"})
+        stream = broadcaster.subscribe("another-process-7")
+        broadcaster.close()
+        return await collect(stream)
+
+    assert f"event: {REFRESH}".encode() in asyncio.run(scenario())[1]
+
+
+def test_malformed_bulk_payload_does_not_announce_a_write(run_app):
+    import server
+
+    async def scenario(client):
+        before = server.broadcaster._last_id
+        response = await client.post("/api/characters/bulk", content=b"{not json", headers={"Content-Type": "application/json"})
+        return response, server.broadcaster._last_id - before
+
+    response, published = run_app(scenario)
+    assert response.status_code == 400
+    assert published == 0
+
+
+def test_writes_reach_open_event_streams(run_app):
+    import server
+
+    async def scenario(client):
+        reader = asyncio.ensure_future(client.get("/api/events"))
+        while not server.broadcaster._subscribers:
+            await asyncio.sleep(0.01)
+        await client.post("/api/story-arcs", json={
+            "title": "Arc", "description": "d", "episodes": "1", "key_events": [], "image": "i", "order": 7,
+        })
+        server.broadcaster.close()
+        return await asyncio.wait_for(reader, 5)
+
+    response = run_app(scenario)
+    assert response.headers["Content-Type"].startswith("text/event-stream")
+    assert b"event: insert" in response.content
+    assert b'"collection":"story_arcs"' in response.content
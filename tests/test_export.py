@@ -0,0 +1,13 @@
+"""Streaming NDJSON exports, run against the seeded fixtures on mongomock"""
+import orjson
+
+
+def test_export_streams_every_document_as_ndjson(run_app):
+    async def scenario(client):
+        return await client.get("/api/story-arcs/export", params={"fields": "order"})
+
+    response = run_app(scenario)
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    assert [orjson.loads(line) for line in response.content.splitlines()] == [
+        {"id": str(order), "order": order} for order in range(1, 7)
+    ]
@@ -0,0 +1,28 @@
+"""Server-side sorting of the list endpoints"""
+import pytest
+
+from filters import parse_sort
+from pagination import ID_SORT
+
+
+def test_sorted_pages_follow_the_requested_order(run_app):
+    async def scenario(client):
+        first = await client.get("/api/characters", params={"limit": 3, "sort": "-name", "fields": "name"})
+        second = await client.get("/api/characters", params={
+            "limit": 3, "sort": "-name", "fields": "name", "after": first.headers["X-Next-Cursor"],
+        })
+        return [character["name"] for character in first.json() + second.json()]
+
+    names = run_app(scenario)
+    assert names == sorted(names, reverse=True)
+    assert len(names) == 6
+
+
+@pytest.mark.parametrize("sort, spec", [
+    ("name", (("name", 1), ("id", 1))),
+    ("-name", (("name", -1), ("id", -1))),
+    ("rank,-name", (("rank", 1), ("name", -1), ("id", -1))),
+    ("-id", (("id", -1),)),
+])
+def test_id_tiebreaker_follows_the_last_sort_key(sort, spec):
+    assert parse_sort("characters", sort, ID_SORT) == spec
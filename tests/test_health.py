@@ -0,0 +1,39 @@
+import pytest
+
+import database
+from health import PingCheck
+
+
+@pytest.fixture
+def fresh_ping(monkeypatch):
+    import server
+
+    # The shared check caches its result across tests otherwise
+    monkeypatch.setattr(server, "ping_check", PingCheck())
+
+
+def test_probes_report_a_healthy_worker(run_app, fresh_ping):
+    async def scenario(client):
+        return await client.get("/api/livez"), await client.get("/api/readyz")
+
+    livez, readyz = run_app(scenario)
+    assert (livez.status_code, livez.json()) == (200, {"status": "alive"})
+    assert readyz.status_code == 200
+    assert readyz.json()["status"] == "ready"
+    assert readyz.json()["database"]["ok"] is True
+
+
+def test_readyz_fails_when_the_database_ping_fails(run_app, fresh_ping, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise ConnectionError("no primary available")
+
+    async def scenario(client):
+        monkeypatch.setattr(database.db, "command", unreachable)
+        return await client.get("/api/livez"), await client.get("/api/readyz")
+
+    livez, readyz = run_app(scenario)
+    # Liveness never touches MongoDB, so it stays up
+    assert livez.status_code == 200
+    assert readyz.status_code == 503
+    assert readyz.json()["status"] == "not ready"
+    assert (readyz.json()["database"]["ok"], readyz.json()["database"]["error"]) == (False, "no primary available")
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from pymongo import ASCENDING
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import database
+import indexes
+from indexes import IndexSpec, check_collection
+
+SPECS = [
+    IndexSpec("id_unique", [("id", ASCENDING)], {"unique": True}),
+    IndexSpec("rank_id", [("rank", ASCENDING), ("id", ASCENDING)]),
+]
+
+
+def run(scenario):
+    async def main():
+        return await scenario(mongomock_motor.AsyncMongoMockClient()["demon_slayer_test"])
+    return asyncio.run(main())
+
+
+def test_missing_and_mismatched_indexes_are_reported():
+    async def scenario(db):
+        # rank_id exists under the declared name with other keys; id_unique does not exist
+        await db.characters.create_index([("rank", ASCENDING)], name="rank_id")
+        await db.characters.create_index([("name", ASCENDING)], name="legacy_name")
+        return await check_collection(db, "characters", SPECS, dry_run=True)
+
+    report = run(scenario)
+    assert report.missing == ["id_unique"]
+    assert len(report.drifted) == 1 and report.drifted[0].startswith("rank_id (keys ")
+    assert report.unexpected == ["legacy_name"]
+    assert not report.in_sync
+
+
+def test_changed_options_count_as_drift():
+    async def scenario(db):
+        await db.characters.create_index([("id", ASCENDING)], name="id_unique")
+        return await check_collection(db, "characters", SPECS[:1])
+
+    report = run(scenario)
+    assert report.drifted == ["id_unique (unique None != True)"]
+
+
+def test_missing_indexes_are_created_unless_dry_run():
+    async def scenario(db):
+        dry = await check_collection(db, "characters", SPECS, dry_run=True)
+        before = sorted(await db.characters.index_information())
+        created = await check_collection(db, "characters", SPECS)
+        after = await check_collection(db, "characters", SPECS)
+        return dry, before, created, after
+
+    dry, before, created, after = run(scenario)
+    assert (dry.created, dry.missing) == ([], ["id_unique", "rank_id"])
+    assert set(before) <= {"_id_"}
+    assert created.created == ["id_unique", "rank_id"]
+    assert after.in_sync
+
+
+def test_cli_dry_run_reports_drift_without_creating_anything(monkeypatch, capsys):
+    monkeypatch.setenv("MONGO_URL", "mongodb://localhost:27017")
+    monkeypatch.setenv("DB_NAME", "demon_slayer_test")
+    client = mongomock_motor.AsyncMongoMockClient()
+    # The CLI closes the shared client; keep this one's data for the checks below
+    monkeypatch.setattr(client, "close", lambda: None)
+    connect = database.connect
+    monkeypatch.setattr(database, "connect", lambda: connect(client_factory=lambda *args, **kwargs: client))
+
+    async def index_names():
+        return [await client["demon_slayer_test"][name].index_information() for name in indexes.INDEXES]
+
+    status = asyncio.run(indexes._main(dry_run=True))
+    output = capsys.readouterr().out
+    assert status == 1
+    assert "characters: DRIFT" in output
+    assert "  missing: id_unique" in output
+    assert all(set(names) <= {"_id_"} for names in asyncio.run(index_names()))
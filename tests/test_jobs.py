@@ -0,0 +1,111 @@
+import asyncio
+
+import orjson
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import database
+import jobs
+from jobs import JOBS_COLLECTION, JobContext, run_export, run_import, submit_job
+from offload import offloader
+
+ARC = {"title": "Arc", "description": "d", "episodes": "1", "key_events": [], "image": "i"}
+
+
+@pytest.fixture
+def run(monkeypatch):
+    # Handlers announce their writes through the shared client
+    monkeypatch.setenv("MONGO_URL", "mongodb://localhost:27017")
+    monkeypatch.setenv("DB_NAME", "demon_slayer_test")
+
+    def run(scenario):
+        async def main():
+            db = database.connect(client_factory=mongomock_motor.AsyncMongoMockClient)
+            try:
+                return await scenario(db)
+            finally:
+                await offloader.shutdown()
+                database.close()
+        return asyncio.run(main())
+    return run
+
+
+async def claimed(db, kind, params):
+    """A queued job as a worker sees it after claiming it"""
+    job = await submit_job(db, kind, params)
+    await db[JOBS_COLLECTION].update_one({"_id": job["_id"]}, {"$set": {"lease_owner": "test"}})
+    return await db[JOBS_COLLECTION].find_one({"_id": job["_id"]})
+
+
+@pytest.fixture(params=["inline", "offloaded"])
+def offload_mode(request, monkeypatch):
+    monkeypatch.setattr(offloader, "kind", "thread")
+    monkeypatch.setattr(offloader, "threshold", 1 if request.param == "offloaded" else 0)
+
+
+def test_import_reports_inserted_and_invalid_items(run, offload_mode, monkeypatch):
+    monkeypatch.setattr(jobs, "BULK_CHUNK_SIZE", 2)
+    items = [{**ARC, "order": 1}, {"title": "missing fields"}, {**ARC, "order": 3}]
+
+    async def scenario(db):
+        job = await claimed(db, "import", {"collection": "story_arcs", "items": items})
+        return await run_import(JobContext(db, job, "test", 30)), await db.story_arcs.count_documents({})
+
+    result, stored = run(scenario)
+    assert (result["inserted"], result["failed"], stored) == (2, 1, 2)
+    assert result["errors"][0]["index"] == 1
+
+
+def test_replayed_import_chunk_is_not_counted_twice(run, monkeypatch):
+    monkeypatch.setattr(jobs, "BULK_CHUNK_SIZE", 2)
+    items = [{**ARC, "order": order} for order in range(3)]
+
+    async def scenario(db):
+        job = await claimed(db, "import", {"collection": "story_arcs", "items": items})
+        await run_import(JobContext(db, job, "test", 30))
+        # The lease was lost before the checkpoint was saved; the next worker starts over
+        return await run_import(JobContext(db, job, "test", 30)), await db.story_arcs.count_documents({})
+
+    result, stored = run(scenario)
+    assert (result["inserted"], stored) == (0, 3)
+
+
+def test_export_writes_the_requested_fields_as_ndjson(run, offload_mode, monkeypatch):
+    monkeypatch.setattr(jobs, "EXPORT_BATCH_SIZE", 2)
+
+    async def scenario(db):
+        await db.story_arcs.insert_many([{"id": str(order), **ARC, "order": order} for order in range(3)])
+        job = await claimed(db, "export", {"collection": "story_arcs", "fields": "title"})
+        result = await run_export(JobContext(db, job, "test", 30))
+        chunks = [chunk["body"] async for chunk in db[jobs.JOB_EXPORTS_COLLECTION].find().sort("sequence", 1)]
+        return result, b"".join(chunks)
+
+    result, body = run(scenario)
+    assert result == {"documents": 3, "chunks": 2}
+    assert body == b'{"id":"0","title":"Arc"}\n{"id":"1","title":"Arc"}\n{"id":"2","title":"Arc"}\n'
+
+
+def test_jobs_run_to_completion_over_http(run_app):
+    async def wait_for(client, location):
+        while True:
+            job = (await client.get(location)).json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            await asyncio.sleep(0.05)
+
+    async def scenario(client):
+        submitted = await client.post("/api/jobs", json={
+            "kind": "import", "params": {"collection": "story_arcs", "items": [{**ARC, "order": 7}]},
+        })
+        imported = await asyncio.wait_for(wait_for(client, submitted.headers["Location"]), 10)
+        exported = await client.post("/api/jobs", json={"kind": "export", "params": {"collection": "story_arcs", "fields": "order"}})
+        location = exported.headers["Location"]
+        export = await asyncio.wait_for(wait_for(client, location), 10)
+        return submitted, imported, export, await client.get(f"{location}/result")
+
+    submitted, imported, export, result = run_app(scenario)
+    assert submitted.status_code == 202
+    assert (imported["status"], imported["result"]["inserted"]) == ("succeeded", 1)
+    assert (export["status"], export["result"]["documents"]) == ("succeeded", 7)
+    assert sorted(orjson.loads(line)["order"] for line in result.content.splitlines()) == list(range(1, 8))
@@ -0,0 +1,95 @@
+import asyncio
+import re
+
+import pytest
+
+import metrics
+from metrics import UNMATCHED_ROUTE, MetricsMiddleware, http_requests
+
+# One exposition line: a metric name, optional {label="value",...} and a value
+SAMPLE = re.compile(
+    r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{(?P<labels>[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*)\})?'
+    r' (?P<value>[-+]?(?:[0-9.]+(?:e[-+]?[0-9]+)?|Inf|NaN))$'
+)
+TYPES = {"counter", "gauge", "histogram", "summary", "untyped"}
+
+
+def requests_for(method, route, status):
+    return http_requests._values.get((method, route, status), 0)
+
+
+def test_requests_are_labelled_with_the_route_template(run_app):
+    route = "/api/characters/{character_id}"
+
+    async def scenario(client):
+        before = requests_for("GET", route, "200")
+        for character_id in ("1", "2", "3"):
+            await client.get(f"/api/characters/{character_id}")
+        await client.get("/api/no-such-thing")
+        return before
+
+    before = run_app(scenario)
+    assert requests_for("GET", route, "200") == before + 3
+    assert requests_for("GET", UNMATCHED_ROUTE, "404") >= 1
+    routes = {labels[1] for labels in http_requests._values}
+    assert not routes & {"/api/characters/1", "/api/characters/2", "/api/characters/3", "/api/no-such-thing"}
+
+
+def test_status_defaults_to_500_when_the_app_fails_before_responding():
+    async def failing(scope, receive, send):
+        raise RuntimeError("boom")
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    before = requests_for("POST", UNMATCHED_ROUTE, "500")
+    with pytest.raises(RuntimeError):
+        asyncio.run(MetricsMiddleware(failing)({"type": "http", "method": "POST", "path": "/x"}, receive, send))
+    assert requests_for("POST", UNMATCHED_ROUTE, "500") == before + 1
+
+
+def test_metrics_endpoint_renders_prometheus_text(run_app):
+    async def scenario(client):
+        await client.get("/api/characters")
+        return await client.get("/api/metrics")
+
+    response = run_app(scenario)
+    assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+    lines = response.text.splitlines()
+    assert response.text.endswith("\n")
+
+    declared = {}
+    buckets = {}
+    for line in lines:
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, type_ = line.split(" ")
+            assert type_ in TYPES and name not in declared
+            declared[name] = type_
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name = match["name"]
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in declared else name
+        assert family in declared, line
+        if name.endswith("_bucket"):
+            series = re.sub(r',?le="[^"]*"', "", match["labels"])
+            buckets.setdefault((family, series), []).append(float(match["value"]))
+
+    assert declared["http_request_duration_seconds"] == "histogram"
+    assert buckets
+    # Histogram buckets are cumulative
+    assert all(counts == sorted(counts) for counts in buckets.values())
+
+
+def test_metrics_without_samples_cannot_be_created():
+    class Incomplete(metrics.Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "help")
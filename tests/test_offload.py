@@ -0,0 +1,17 @@
+"""Offloaded page encoding, run against the seeded fixtures on mongomock"""
+from offload import offloader
+
+
+def test_offloaded_pages_match_pages_built_inline(run_app, monkeypatch):
+    monkeypatch.setattr(offloader, "kind", "thread")
+
+    async def scenario(client):
+        inline = await client.get("/api/characters")
+        monkeypatch.setattr(offloader, "threshold", 1)
+        # A different limit is a different cache entry, so this page is rebuilt
+        offloaded = await client.get("/api/characters", params={"limit": 99})
+        return inline, offloaded
+
+    inline, offloaded = run_app(scenario)
+    assert offloaded.content == inline.content
+    assert offloaded.headers["ETag"] == inline.headers["ETag"]
@@ -0,0 +1,65 @@
+import base64
+import json
+
+import pytest
+
+from pagination import ID_SORT, STORY_ARC_SORT, InvalidCursor, cursor_for, decode_cursor, keyset_filter
+
+
+def forged(signature, values):
+    raw = json.dumps([signature, values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_cursor_round_trips_the_sort_keys():
+    cursor = cursor_for({"id": "7", "order": 3, "title": "Mugen Train"}, STORY_ARC_SORT)
+    assert decode_cursor(cursor, STORY_ARC_SORT) == [3, "7"]
+
+
+def test_keyset_filter_seeks_past_the_last_row():
+    assert keyset_filter(STORY_ARC_SORT, [3, "7"]) == {
+        "$or": [{"order": {"$gt": 3}}, {"order": 3, "id": {"$gt": "7"}}],
+    }
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    forged("id", ["1", "2"]),
+    forged("-id", ["1"]),
+    forged("id", "1"),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, ID_SORT)
+
+
+@pytest.mark.parametrize("value", [{"$ne": None}, {"$regex": ".*"}, ["1"]])
+def test_cursor_values_cannot_smuggle_operators(value):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(forged("id", [value]), ID_SORT)
+
+
+def test_cursor_pages_through_every_document_once(run_app):
+    async def scenario(client):
+        pages, after = [], None
+        while True:
+            response = await client.get("/api/story-arcs", params={"limit": 4, **({"after": after} if after else {})})
+            pages.append([arc["order"] for arc in response.json()])
+            after = response.headers.get("X-Next-Cursor")
+            if after is None:
+                return pages
+
+    assert run_app(scenario) == [[1, 2, 3, 4], [5, 6]]
+
+
+@pytest.mark.parametrize("after", [
+    "garbage",
+    forged("order,id", [{"$gt": 0}, "1"]),
+    # A cursor from another ordering
+    forged("id", ["1"]),
+])
+def test_tampered_cursors_are_rejected_with_400(run_app, after):
+    async def scenario(client):
+        return await client.get("/api/story-arcs", params={"after": after})
+
+    assert run_app(scenario).status_code == 400
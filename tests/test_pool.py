@@ -0,0 +1,91 @@
+import pytest
+from pymongo import monitoring
+
+import database
+import pool_metrics
+from pool_metrics import PoolCheckoutListener
+
+ADDRESS = ("localhost", 27017)
+POOL_ENV = ("MONGO_MAX_POOL_SIZE", "MONGO_MIN_POOL_SIZE", "MONGO_WAIT_QUEUE_TIMEOUT_MS", "MONGO_COMPRESSORS")
+
+
+class Clock:
+    """Stands in for the time module so checkout waits are exact"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pool_metrics, "time", clock)
+    return clock
+
+
+def check_out(listener, clock, waited, connection_id=1):
+    listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    clock.now += waited
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, connection_id))
+
+
+def test_checkouts_count_connections_in_use_and_their_waits(clock):
+    listener = PoolCheckoutListener()
+    check_out(listener, clock, 0.002, 1)
+    check_out(listener, clock, 0.2, 2)
+    listener.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+
+    snapshot = listener.snapshot()
+    assert snapshot["in_use"] == {"localhost:27017": 1}
+    assert snapshot["checkout_attempts"] == 2
+    assert snapshot["wait_seconds_total"] == pytest.approx(0.202)
+    assert snapshot["wait_seconds_max"] == pytest.approx(0.2)
+    histogram = {bucket["le"]: bucket["count"] for bucket in snapshot["wait_histogram"]}
+    assert (histogram[0.001], histogram[0.0025], histogram[0.1], histogram[0.25]) == (0, 1, 1, 2)
+
+
+def test_failed_checkouts_are_counted_by_reason(clock):
+    listener = PoolCheckoutListener()
+    for reason in ("timeout", "timeout", "poolClosed"):
+        listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+        clock.now += 1.0
+        listener.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(ADDRESS, reason))
+
+    snapshot = listener.snapshot()
+    assert snapshot["checkout_failures"] == {"timeout": 2, "poolClosed": 1}
+    assert snapshot["checkout_attempts"] == 3
+    assert snapshot["in_use"] == {}
+
+
+def test_client_options_map_the_pool_settings(monkeypatch):
+    for name in POOL_ENV:
+        monkeypatch.delenv(name, raising=False)
+    defaults = database.client_options()
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_MIN_POOL_SIZE", "5")
+    monkeypatch.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "250")
+    configured = database.client_options()
+
+    assert (defaults["maxPoolSize"], defaults["minPoolSize"]) == (100, 0)
+    assert "waitQueueTimeoutMS" not in defaults
+    assert (configured["maxPoolSize"], configured["minPoolSize"], configured["waitQueueTimeoutMS"]) == (20, 5, 250)
+    assert pool_metrics.pool_listener in configured["event_listeners"]
+
+
+@pytest.mark.parametrize("env", [
+    {"MONGO_MAX_POOL_SIZE": "lots"},
+    {"MONGO_MIN_POOL_SIZE": "-1"},
+    {"MONGO_WAIT_QUEUE_TIMEOUT_MS": "1.5"},
+    {"MONGO_MAX_POOL_SIZE": "5", "MONGO_MIN_POOL_SIZE": "10"},
+])
+def test_client_options_reject_invalid_pool_settings(monkeypatch, env):
+    for name in POOL_ENV:
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValueError):
+        database.client_options()
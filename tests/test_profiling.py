@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import profiling
+from profiling import ProfileStore
+
+
+def save_profiles(store, count):
+    ids = []
+    for i in range(count):
+        ids.append(store.save(b"data", "prof", {"path": f"/api/{i}"}))
+        # Stored names are ordered by their millisecond timestamp
+        time.sleep(0.002)
+    return ids
+
+
+def test_ring_buffer_keeps_only_the_newest_profiles(tmp_path):
+    store = ProfileStore(tmp_path, keep=3)
+    ids = save_profiles(store, 5)
+
+    assert [meta["id"] for meta in store.list()] == ids[:1:-1]
+    assert len(list(tmp_path.iterdir())) == 6
+    assert store.find(ids[0]) is None
+    assert store.find(ids[-1])["path"].read_bytes() == b"data"
+
+
+@pytest.mark.parametrize("profile_id", ["*", "../secret", "0" * 31, "A" * 32, "0" * 32 + ".json"])
+def test_find_rejects_ids_that_are_not_profile_ids(tmp_path, profile_id):
+    store = ProfileStore(tmp_path, keep=3)
+    save_profiles(store, 1)
+
+    assert store.find(profile_id) is None
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile": "wrong"}])
+def test_profile_endpoints_require_the_token_when_one_is_set(run_app, monkeypatch, headers):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+
+    async def scenario(client):
+        listing = await client.get("/api/profiles", headers=headers)
+        single = await client.get("/api/profiles/" + "0" * 32, headers=headers)
+        allowed = await client.get("/api/profiles", headers={"X-Profile": "secret"})
+        return listing, single, allowed
+
+    listing, single, allowed = run_app(scenario)
+    assert listing.status_code == 403
+    assert single.status_code == 403
+    assert allowed.status_code == 200
@@ -0,0 +1,14 @@
+"""fields= sparse fieldsets, run against the seeded fixtures on mongomock"""
+
+
+def test_fields_limits_the_returned_fields(run_app):
+    async def scenario(client):
+        page = await client.get("/api/characters", params={"fields": "name,rank", "limit": 2})
+        single = await client.get("/api/story-arcs/1", params={"fields": "title"})
+        unknown = await client.get("/api/characters", params={"fields": "name,password"})
+        return page, single, unknown
+
+    page, single, unknown = run_app(scenario)
+    assert [set(character) for character in page.json()] == [{"id", "name", "rank"}] * 2
+    assert single.json() == {"id": "1", "title": "Final Selection Arc"}
+    assert unknown.status_code == 400
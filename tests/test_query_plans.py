@@ -0,0 +1,131 @@
+"""Every query shape the list endpoints issue must be answered from an index.
+
+Each entry in QUERIES mirrors a filter/sort combination the API can send,
+and check_query_plans() flags any whose winning plan falls back to a
+collection scan, or to a blocking in-memory SORT for orderings an index
+should provide. That needs explain() against a real server, so it is
+skipped unless MONGO_URL is set; it always runs in a freshly named scratch
+database, whatever DB_NAME says, which is dropped afterwards.
+"""
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from filters import build_query, parse_sort
+from pagination import ID_SORT, STORY_ARC_SORT, SortSpec, cursor_for, decode_cursor, keyset_filter
+
+requires_mongo = pytest.mark.skipif(not os.environ.get("MONGO_URL"), reason="MONGO_URL is not set")
+
+
+@dataclass(frozen=True)
+class PlannedQuery:
+    name: str
+    collection: str
+    query: Dict[str, Any]
+    sort: Optional[SortSpec] = None
+    # The sort must come straight from the index, with no blocking SORT stage
+    index_sorted: bool = False
+
+
+def _seek(sort: SortSpec, **last_row) -> Dict[str, Any]:
+    """Keyset filter for a page following a row with the given sort values"""
+    return keyset_filter(sort, decode_cursor(cursor_for(last_row, sort), sort))
+
+
+QUERIES: List[PlannedQuery] = [
+    PlannedQuery("character by id", "characters", {"id": "1"}),
+    PlannedQuery("characters by ids", "characters", {"id": {"$in": ["1", "3", "5"]}}),
+    PlannedQuery("characters page", "characters", {}, ID_SORT),
+    PlannedQuery("characters next page", "characters", _seek(ID_SORT, id="3"), ID_SORT),
+    PlannedQuery("characters by rank", "characters", build_query(rank="Hashira"), ID_SORT),
+    PlannedQuery("characters by breathing", "characters", build_query(breathing="Water Breathing"), ID_SORT),
+    PlannedQuery("characters sorted by name", "characters", {}, parse_sort("characters", "name", ID_SORT), True),
+    PlannedQuery("characters sorted by name descending", "characters", {},
+                 parse_sort("characters", "-name", ID_SORT), True),
+    PlannedQuery("characters by descending rank, next page", "characters",
+                 _seek(parse_sort("characters", "-rank", ID_SORT), rank="Hashira", id="4"),
+                 parse_sort("characters", "-rank", ID_SORT), True),
+    PlannedQuery("story arcs by descending order", "story_arcs", {},
+                 parse_sort("story_arcs", "-order", STORY_ARC_SORT), True),
+    PlannedQuery("characters text search", "characters", build_query("demon"), ID_SORT),
+    PlannedQuery("characters by name (join)", "characters", {"name": {"$in": ["Tanjiro Kamado", "Giyu Tomioka"]}}, ID_SORT),
+    PlannedQuery("characters by breathing style (join)", "characters", {"breathing_styles": "Water Breathing"},
+                 ID_SORT, True),
+    PlannedQuery("technique by id", "breathing_techniques", {"id": "1"}),
+    PlannedQuery("techniques by name (join)", "breathing_techniques",
+                 {"name": {"$in": ["Water Breathing", "Sun Breathing"]}}, ID_SORT),
+    PlannedQuery("techniques by user (join)", "breathing_techniques", {"users": "Tanjiro Kamado"}, ID_SORT, True),
+    PlannedQuery("techniques by element", "breathing_techniques", build_query(element="💧"), ID_SORT),
+    PlannedQuery("techniques by user", "breathing_techniques", build_query(users="Tanjiro Kamado"), ID_SORT),
+    PlannedQuery("techniques text search", "breathing_techniques", build_query("thunder"), ID_SORT),
+    PlannedQuery("story arc by id", "story_arcs", {"id": "1"}),
+    PlannedQuery("story arcs page", "story_arcs", {}, STORY_ARC_SORT),
+    PlannedQuery("story arcs next page", "story_arcs", _seek(STORY_ARC_SORT, order=2, id="2"), STORY_ARC_SORT),
+    PlannedQuery("story arcs order range", "story_arcs", build_query(order={"$gte": 2, "$lte": 4}), STORY_ARC_SORT),
+    PlannedQuery("story arcs text search", "story_arcs", build_query("muzan"), STORY_ARC_SORT),
+]
+
+
+def plan_stages(plan: Dict[str, Any]) -> Iterator[str]:
+    """Yield every stage name in an explain() plan tree"""
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan", "outerStage", "innerStage"):
+        if isinstance(plan.get(key), dict):
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+async def explain(db, planned: PlannedQuery) -> List[str]:
+    """Stages of the winning plan for one query"""
+    cursor = db[planned.collection].find(planned.query)
+    if planned.sort:
+        cursor = cursor.sort(list(planned.sort))
+    result = await cursor.limit(101).explain()
+    return list(plan_stages(result["queryPlanner"]["winningPlan"]))
+
+
+async def check_query_plans(db) -> Dict[str, List[str]]:
+    """Map each query that scans a whole collection, or sorts in memory when
+    it should not, to its plan stages"""
+    failures = {}
+    for planned in QUERIES:
+        stages = await explain(db, planned)
+        if "COLLSCAN" in stages or (planned.index_sorted and "SORT" in stages):
+            failures[planned.name] = stages
+    return failures
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {
+        "stage": "FETCH",
+        "inputStage": {
+            "stage": "OR",
+            "inputStages": [{"stage": "IXSCAN"}, {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}],
+        },
+    }
+    assert list(plan_stages(plan)) == ["FETCH", "OR", "IXSCAN", "SORT", "COLLSCAN"]
+
+
+@requires_mongo
+def test_no_query_falls_back_to_a_collection_scan(monkeypatch):
+    scratch = f"demon_slayer_query_plans_{uuid.uuid4().hex[:8]}"
+    monkeypatch.setenv("DB_NAME", scratch)
+    import database
+    from indexes import ensure_indexes
+
+    async def check():
+        db = database.connect()
+        try:
+            await ensure_indexes(db)
+            return await check_query_plans(db)
+        finally:
+            await database.client.drop_database(scratch)
+            database.close()
+
+    assert asyncio.run(check()) == {}
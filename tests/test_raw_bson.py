@@ -0,0 +1,77 @@
+"""The raw BSON page path must produce exactly the bytes of the read-model path"""
+from datetime import datetime
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from models import Character, StoryArc
+from projection import partial_model
+from raw_bson import decode_batch, decode_rows, encode_raw_batch, encode_raw_page, raw_batch
+from read_models import row_factory
+from serialization import encode_page
+
+CODEC_OPTIONS = CodecOptions()
+
+CHARACTERS = [
+    # Stored in model order, as the API writes it
+    {"id": "1", "name": "Tanjiro Kamado", "description": "d", "breathing": "Water Breathing", "rank": "Mizunoto",
+     "image": "i", "abilities": ["a"], "personality": "p", "created_at": datetime(2024, 1, 2, 3, 4, 5, 678000),
+     "updated_at": None},
+    # Fields out of order, an extra stored key and no updated_at
+    {"personality": "p", "id": "2", "breathing_styles": ["Thunder Breathing"], "name": "Zenitsu Agatsuma",
+     "description": "d", "breathing": "Thunder Breathing", "rank": "Mizunoto", "image": "i", "abilities": [],
+     "created_at": datetime(2024, 1, 1)},
+    # Written before created_at was stored, later replaced
+    {"id": "3", "name": "Inosuke Hashibira", "description": "d", "breathing": "Beast Breathing", "rank": "Mizunoto",
+     "image": "i", "abilities": [], "personality": "p", "updated_at": datetime(2024, 2, 1)},
+]
+
+
+def raw_documents(documents):
+    return [RawBSONDocument(bson.encode(document)) for document in documents]
+
+
+def read_model_page(model, documents, fields=None, next_cursor=None):
+    build = row_factory(model, fields)
+    return encode_page([build(bson.decode(bson.encode(document))) for document in documents], next_cursor)
+
+
+def test_full_documents_encode_identically():
+    rows = decode_rows(raw_documents(CHARACTERS), list(Character.model_fields), CODEC_OPTIONS)
+    raw = encode_raw_page(rows, "next")
+    expected = read_model_page(Character, CHARACTERS, next_cursor="next")
+
+    assert raw == expected
+    assert raw.last_modified is None
+
+
+def test_sparse_fieldsets_encode_identically():
+    fields = ["name", "rank"]
+    names = list(partial_model(Character, fields).model_fields)
+    # The id sort key is always read, even when it was not asked for
+    documents = [{"id": d["id"], "name": d["name"], "rank": d["rank"]} for d in CHARACTERS]
+    rows = decode_rows(raw_documents(documents), names, CODEC_OPTIONS)
+
+    assert encode_raw_page(rows) == read_model_page(Character, documents, fields)
+
+
+def test_joined_batch_matches_decoding_each_document():
+    arcs = [
+        {"id": str(order), "title": "Arc", "description": "d", "episodes": "1", "key_events": [], "image": "i",
+         "order": order, "created_at": datetime(2024, 1, order)}
+        for order in range(1, 4)
+    ]
+    names = list(StoryArc.model_fields)
+    data = raw_batch(raw_documents(arcs))
+
+    assert decode_batch(data, names, CODEC_OPTIONS) == decode_rows(raw_documents(arcs), names, CODEC_OPTIONS)
+    assert encode_raw_batch(data, names, CODEC_OPTIONS) == read_model_page(StoryArc, arcs)
+
+
+def test_rows_come_back_in_model_field_order():
+    names = list(Character.model_fields)
+    rows = decode_rows(raw_documents(CHARACTERS), names, CODEC_OPTIONS)
+
+    assert all(list(row) == names for row in rows)
+    assert rows[2]["created_at"] is None
@@ -0,0 +1,41 @@
+"""expand= joins between characters and breathing techniques, run on mongomock"""
+import asyncio
+
+import pytest
+
+import relations
+
+
+def test_expand_joins_related_documents(run_app):
+    async def scenario(client):
+        character = await client.get("/api/characters/1", params={"expand": "techniques"})
+        technique = await client.get("/api/breathing-techniques/2", params={"expand": "characters"})
+        wrong = await client.get("/api/characters/1", params={"expand": "characters"})
+        sparse = await client.get("/api/characters/1", params={"expand": "techniques", "fields": "name"})
+        return character, technique, wrong, sparse
+
+    character, technique, wrong, sparse = run_app(scenario)
+    assert {"Water Breathing", "Sun Breathing"} <= {t["name"] for t in character.json()["techniques"]}
+    assert "breathing_styles" not in character.json()
+    assert "Zenitsu Agatsuma" in {c["name"] for c in technique.json()["characters"]}
+    assert wrong.status_code == 400
+    assert sparse.status_code == 400
+
+
+def test_expansions_are_capped_per_side_in_id_order(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr(relations, "MAX_EXPANDED", 2)
+
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()["demon_slayer_test"]
+        await db.breathing_techniques.insert_one({"id": "mist", "name": "Mist Breathing", "users": ["C", "A", "B"]})
+        # Inserted out of id order, so storage order would pick other documents
+        await db.characters.insert_many(
+            [{"id": id_, "name": id_, "breathing_styles": ["Mist Breathing"]} for id_ in ("s3", "s1", "s2")]
+            + [{"id": id_, "name": name, "breathing_styles": []} for id_, name in (("u3", "C"), ("u1", "A"), ("u2", "B"))]
+        )
+        return await relations.fetch_graph(db, "breathing_techniques", "mist")
+
+    graph = asyncio.run(scenario())
+    # The first MAX_EXPANDED ids found by breathing style, then by users
+    assert [character["id"] for character in graph["characters"]] == ["s1", "s2", "u1", "u2"]
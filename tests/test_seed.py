@@ -0,0 +1,94 @@
+import asyncio
+from dataclasses import replace
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from seed import apply_seed, load_fixtures
+
+
+def run(scenario):
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()["demon_slayer_test"]
+        return await scenario(db)
+    return asyncio.run(main())
+
+
+def test_seed_inserts_every_fixture_once():
+    fixtures = load_fixtures()
+
+    async def scenario(db):
+        first = await apply_seed(db, fixtures)
+        again = await apply_seed(db, fixtures)
+        return first, again, await db.characters.count_documents({})
+
+    first, again, count = run(scenario)
+    assert (first, again) == (True, False)
+    assert count == len(fixtures.documents["characters"])
+
+
+def test_new_version_keeps_edits_and_deletions():
+    fixtures = load_fixtures()
+    edited, deleted = (document["id"] for document in fixtures.documents["characters"][:2])
+
+    async def scenario(db):
+        await apply_seed(db, fixtures)
+        await db.characters.update_one({"id": edited}, {"$set": {"rank": "Retired"}})
+        await db.characters.delete_one({"id": deleted})
+        await apply_seed(db, replace(fixtures, version=fixtures.version + 1))
+        return await db.characters.find_one({"id": edited}), await db.characters.find_one({"id": deleted})
+
+    edited_document, deleted_document = run(scenario)
+    assert edited_document["rank"] == "Retired"
+    assert deleted_document is None
+
+
+def test_force_restores_deleted_samples_without_overwriting_edits():
+    fixtures = load_fixtures()
+    edited, deleted = (document["id"] for document in fixtures.documents["characters"][:2])
+
+    async def scenario(db):
+        await apply_seed(db, fixtures)
+        await db.characters.update_one({"id": edited}, {"$set": {"rank": "Retired"}})
+        await db.characters.delete_one({"id": deleted})
+        await apply_seed(db, fixtures, force=True)
+        return await db.characters.find_one({"id": edited}), await db.characters.find_one({"id": deleted})
+
+    edited_document, deleted_document = run(scenario)
+    assert edited_document["rank"] == "Retired"
+    assert deleted_document is not None
+
+
+def test_documents_without_created_at_are_backfilled():
+    fixtures = load_fixtures()
+
+    async def scenario(db):
+        await db.story_arcs.insert_one({"id": "legacy", "title": "Legacy", "order": 99})
+        await db.story_arcs.insert_one({"id": "null", "title": "Null", "order": 98, "created_at": None})
+        await apply_seed(db, fixtures)
+        return [document["created_at"] async for document in db.story_arcs.find({"id": {"$in": ["legacy", "null"]}})]
+
+    assert run(scenario) == [fixtures.created_at, fixtures.created_at]
+
+
+def test_collections_holding_other_data_get_no_samples(monkeypatch):
+    import seed
+
+    fixtures = load_fixtures()
+
+    async def scenario(db):
+        await db.characters.insert_one({"id": "real", "name": "Real"})
+        await apply_seed(db, fixtures)
+        unseeded = await db.characters.count_documents({}), await db.story_arcs.count_documents({})
+        # A later version still leaves the collection alone
+        await apply_seed(db, replace(fixtures, version=fixtures.version + 1))
+        later = await db.characters.count_documents({})
+        monkeypatch.setattr(seed, "SEED_SAMPLE_DATA", True)
+        await apply_seed(db, replace(fixtures, version=fixtures.version + 2))
+        return unseeded, later, await db.characters.count_documents({})
+
+    (characters, arcs), later, opted_in = run(scenario)
+    assert characters == later == 1
+    assert arcs == len(fixtures.documents["story_arcs"])
+    assert opted_in == 1 + len(fixtures.documents["characters"])
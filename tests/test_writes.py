@@ -0,0 +1,159 @@
+"""Conditional and idempotent writes, run against mongomock through the ASGI app"""
+from datetime import datetime
+
+import pytest
+
+import database
+from idempotency import IDEMPOTENCY_COLLECTION, REPLAYED_HEADER, request_fingerprint
+
+CHARACTER = {
+    "name": "Murata",
+    "description": "d",
+    "breathing": "Water Breathing",
+    "rank": "Mizunoto",
+    "image": "i",
+    "abilities": [],
+    "personality": "p",
+}
+
+
+def test_retry_with_the_same_key_replays_the_response(run_app):
+    async def scenario(client):
+        headers = {"Idempotency-Key": "replay"}
+        first = await client.post("/api/characters", json=CHARACTER, headers=headers)
+        retry = await client.post("/api/characters", json=CHARACTER, headers=headers)
+        stored = await database.get_collection("characters").count_documents({"name": CHARACTER["name"]})
+        return first, retry, stored
+
+    first, retry, stored = run_app(scenario)
+    assert first.status_code == 200
+    assert REPLAYED_HEADER not in first.headers
+    assert retry.status_code == 200
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.content == first.content
+    assert stored == 1
+
+
+def test_retry_while_the_first_request_is_pending_gets_409(run_app):
+    async def scenario(client):
+        post = client.build_request("POST", "/api/characters", json=CHARACTER, headers={"Idempotency-Key": "pending"})
+        await database.get_collection(IDEMPOTENCY_COLLECTION).insert_one({
+            "_id": "POST /api/characters pending",
+            "fingerprint": request_fingerprint(post, post.content),
+            "status": "pending",
+            "created_at": datetime.utcnow(),
+        })
+        return await client.send(post)
+
+    response = run_app(scenario)
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_same_key_with_a_different_body_gets_422(run_app):
+    async def scenario(client):
+        headers = {"Idempotency-Key": "reused"}
+        await client.post("/api/characters", json=CHARACTER, headers=headers)
+        return await client.post("/api/characters", json={**CHARACTER, "name": "Ozaki"}, headers=headers)
+
+    assert run_app(scenario).status_code == 422
+
+
+def test_put_with_a_stale_if_match_gets_412(run_app):
+    async def scenario(client):
+        created = await client.put("/api/characters/murata", json=CHARACTER, headers={"If-None-Match": "*"})
+        etag = created.headers["ETag"]
+        updated = await client.put("/api/characters/murata", json={**CHARACTER, "rank": "Kanoe"}, headers={"If-Match": etag})
+        stale = await client.put("/api/characters/murata", json={**CHARACTER, "rank": "Hashira"}, headers={"If-Match": etag})
+        weak = await client.put("/api/characters/murata", json=CHARACTER, headers={"If-Match": "W/" + updated.headers["ETag"]})
+        current = await client.get("/api/characters/murata")
+        return created, updated, stale, weak, current
+
+    created, updated, stale, weak, current = run_app(scenario)
+    assert created.status_code == 201
+    assert updated.status_code == 200
+    assert stale.status_code == 412
+    assert weak.status_code == 412
+    assert current.json()["rank"] == "Kanoe"
+
+
+def test_etag_from_get_satisfies_if_match_on_put(run_app):
+    async def scenario(client):
+        # Written before created_at was always stored
+        await database.get_collection("characters").insert_one({"id": "legacy", **CHARACTER})
+        read = await client.get("/api/characters/legacy")
+        written = await client.put("/api/characters/legacy", json={**CHARACTER, "rank": "Kanoe"},
+                                   headers={"If-Match": read.headers["ETag"]})
+        reread = await client.get("/api/characters/legacy")
+        return read, written, reread
+
+    read, written, reread = run_app(scenario)
+    assert read.json()["created_at"] is None
+    assert written.status_code == 200
+    assert written.json()["created_at"] is None
+    assert written.headers["ETag"] == reread.headers["ETag"]
+    assert written.content == reread.content
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "br"])
+def test_etag_from_a_compressed_get_satisfies_if_match_on_put(run_app, accept_encoding):
+    if accept_encoding == "br":
+        pytest.importorskip("brotli")
+    large = {**CHARACTER, "description": "d" * 3000}
+
+    async def scenario(client):
+        await client.put("/api/characters/large", json=large, headers={"If-None-Match": "*"})
+        read = await client.get("/api/characters/large", headers={"Accept-Encoding": accept_encoding})
+        written = await client.put("/api/characters/large", json={**large, "rank": "Kanoe"},
+                                   headers={"If-Match": read.headers["ETag"]})
+        stale = await client.put("/api/characters/large", json=large, headers={"If-Match": read.headers["ETag"]})
+        return read, written, stale
+
+    read, written, stale = run_app(scenario)
+    assert read.headers["Content-Encoding"] == accept_encoding
+    assert not read.headers["ETag"].startswith("W/")
+    assert written.status_code == 200
+    assert stale.status_code == 412
+
+
+def test_put_moves_last_modified_forward(run_app):
+    async def scenario(client):
+        await database.get_collection("story_arcs").insert_one(
+            {"id": "old", "title": "T", "description": "d", "episodes": "1", "key_events": [], "image": "i",
+             "order": 90, "created_at": datetime(2020, 1, 1)},
+        )
+        read = await client.get("/api/story-arcs/old")
+        await client.put("/api/story-arcs/old", json={
+            "title": "Renamed", "description": "d", "episodes": "1", "key_events": [], "image": "i", "order": 90,
+        })
+        revalidated = await client.get("/api/story-arcs/old", headers={"If-Modified-Since": read.headers["Last-Modified"]})
+        return read, revalidated
+
+    read, revalidated = run_app(scenario)
+    assert read.headers["Last-Modified"] == "Wed, 01 Jan 2020 00:00:00 GMT"
+    assert revalidated.status_code == 200
+    assert revalidated.json()["title"] == "Renamed"
+    assert revalidated.json()["updated_at"] is not None
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/breathing-techniques/mist",
+     {"name": "Mist", "description": "d", "forms": [], "users": [], "color": "white", "element": "Mist"}),
+    ("/api/story-arcs/swordsmith",
+     {"title": "Swordsmith Village", "description": "d", "episodes": "1", "key_events": [], "image": "i", "order": 50}),
+])
+def test_every_collection_supports_conditional_put(run_app, path, body):
+    async def scenario(client):
+        created = await client.put(path, json=body, headers={"If-None-Match": "*"})
+        again = await client.put(path, json=body, headers={"If-None-Match": "*"})
+        updated = await client.put(path, json=body, headers={"If-Match": created.headers["ETag"]})
+        stale = await client.put(path, json=body, headers={"If-Match": created.headers["ETag"]})
+        current = await client.get(path)
+        return created, again, updated, stale, current
+
+    created, again, updated, stale, current = run_app(scenario)
+    assert (created.status_code, created.headers["Location"]) == (201, path)
+    assert again.status_code == 412
+    assert updated.status_code == 200
+    assert stale.status_code == 412
+    assert current.headers["ETag"] == updated.headers["ETag"]